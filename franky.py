@@ -7,17 +7,23 @@ Uses ESP32 via UDP for audio streaming, MQTT only for control
 import os
 import asyncio
 import json
+import math
 import base64
+import errno
+import binascii
 import random
 import numpy as np
 import struct
 import socket
+import time
+import threading
 import argparse
+from pathlib import Path
+import sys
 from datetime import datetime
 from websockets import connect
 from dotenv import load_dotenv
 import pygame
-from collections import deque
 from scipy import signal
 
 try:
@@ -42,13 +48,359 @@ except ImportError:
     TINYTUYA_AVAILABLE = False
     print("⚠️  tinytuya not installed. Smart light control disabled. Install with: pip install tinytuya")
 
+# uvloop (libuv event loop) cuts per-callback overhead for the UDP/websocket tasks; not available on Windows
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# orjson parses the ~25/s OpenAI audio delta events about 2x faster than stdlib json
+try:
+    import orjson
+    json_loads = orjson.loads
+    ORJSON_AVAILABLE = True
+except ImportError:
+    json_loads = json.loads
+    ORJSON_AVAILABLE = False
+
+# sendmmsg(2)/recvmmsg(2) move several ESP32 audio datagrams per syscall (Linux only)
+SENDMMSG_AVAILABLE = False
+RECVMMSG_AVAILABLE = False
+if sys.platform.startswith("linux"):
+    try:
+        import ctypes
+        import ctypes.util
+
+        class _IOVec(ctypes.Structure):
+            _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+        class _MsgHdr(ctypes.Structure):
+            _fields_ = [
+                ("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_IOVec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int),
+            ]
+
+        class _MMsgHdr(ctypes.Structure):
+            _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+        class _SockAddrIn(ctypes.Structure):
+            _fields_ = [
+                ("sin_family", ctypes.c_ushort),
+                ("sin_port", ctypes.c_uint16),  # Network byte order
+                ("sin_addr", ctypes.c_ubyte * 4),
+                ("sin_zero", ctypes.c_ubyte * 8),
+            ]
+
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        _sendmmsg = _libc.sendmmsg
+        _sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+        _sendmmsg.restype = ctypes.c_int
+        SENDMMSG_AVAILABLE = True
+        _recvmmsg = _libc.recvmmsg
+        _recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        _recvmmsg.restype = ctypes.c_int
+        RECVMMSG_AVAILABLE = True
+    except (OSError, AttributeError):
+        pass
+
 load_dotenv()
 
+# input_audio_buffer.append envelope; the base64 payload goes between prefix and suffix
+AUDIO_APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+AUDIO_APPEND_SUFFIX = '"}'
+RESPONSE_CREATE_JSON = '{"type":"response.create"}'
+# function_call_output envelope; only call_id and output are serialized per reply
+FUNCTION_OUTPUT_PREFIX = '{"type":"conversation.item.create","item":{"type":"function_call_output","call_id":'
+FUNCTION_OUTPUT_MIDDLE = ',"output":'
+FUNCTION_OUTPUT_SUFFIX = '}}'
+
+# System prompt pieces, built once at import; __init__ only substitutes the per-run parts
+INTERACTION_START_CAMERA = """## Start of Each Interaction (strict sequence)
+1. FIRST call **look_at_camera** tool, THEN speak.
+2. Brief intro: "I'm Franky, the talking skull!" (in guest's language).
+3. Ask for name and **STOP**. Wait for answer, don't invent.
+4. After answer: "Oh, [name]! That sounds truly spooky/cool!"
+5. Offer treat:
+   - RU: "Я приготовила для вас угощения… хотите?"
+   - EN: "I cooked up some treats… want one?"
+   - ES: "He preparado dulces… ¿quieren?"
+6. Invite: "Come inside, let's have fun!" (in guest's language).
+7. Proceed to **ONE** short bit (joke/mini-game/riddle), ≤ 15-20 sec."""
+
+INTERACTION_START_NO_CAMERA = """## Start of Each Interaction (strict sequence)
+1. Brief intro: "I'm Franky, the talking skull!" (in guest's language).
+2. Ask for name and **STOP**. Wait for answer, don't invent.
+3. After answer: "Oh, [name]! That sounds truly spooky/cool!"
+4. Offer treat:
+   - RU: "Я приготовила для вас угощения… хотите?"
+   - EN: "I cooked up some treats… want one?"
+   - ES: "He preparado dulces… ¿quieren?"
+5. Invite: "Come inside, let's have fun!" (in guest's language).
+6. Proceed to **ONE** short bit (joke/mini-game/riddle), ≤ 15-20 sec."""
+
+SYSTEM_PROMPT_TEMPLATE = """
+## Who You Are
+You are Franky, a talking Halloween skull. Friendly, funny, with a playful "spooky" twist. Your goal is to lightly scare, amuse, and engage guests in short interactions. Keep responses SHORT by default (~1-2 sentences), but continue if guests are clearly interested.
+
+## Multilingual (REQUIRED)
+- **Auto-mirror** the guest's language from their speech. If unsure, greet briefly in English and ask which language they prefer.
+- Use **call-and-response** phrases so guests can **finish** them (language-specific examples below).
+- Split into simple sentences and speak slightly slower if language switches.
+- ⚠️ **NEVER translate jokes from one language to another!** Jokes don't work when translated. If guest speaks Russian, tell RUSSIAN jokes. If English, tell ENGLISH jokes. Create NEW jokes in guest's language, don't translate!
+
+{interaction_start}
+
+## Interaction Rotation (randomness and variety)
+Each time choose a **different** type of bit, don't repeat consecutively:
+- Joke/pun (skeleton/Halloween themed).
+- Light scare "BOO!" with immediate friendly recovery.
+- Kids riddle.
+- Mini-game (below).
+- Costume compliment (general if unsure of details).
+
+## "Skull Starts — Guests Finish" (language-specific)
+**Russian (RU)**
+- "Сладость или…" → "гадость!"
+- "Абра-ка…" → "дабра!"
+- "Счастливого Хэлло…" → "уина!"
+- "Тук-тук!" → "Кто там?" → "Череп!" → "Череп кто?" → "Череп, который пугает — БУ!"
+
+**English (EN)**
+- "Trick or…" → "treat!"
+- "Abra-ca…" → "dabra!"
+- "Happy Hallow…" → "ween!"
+- "Knock, knock!" → "Who's there?" → "Skull!" → "Skull who?" → "Skull that scares you—BOO!"
+
+**Spanish (ES)**
+- "Truco o…" → "trato!"
+- "A la de una, a la de dos… a la de…" → "¡tres!"
+- "Feliz Hallo…" → "ween!"
+
+If guests are small kids, give hint: "Let's say together: Trick or… (pause)".
+
+## Mini-Games (20-60 sec)
+- **"Treat or Spell?"**
+  Ask for "password": RU "Сладость или гадость!", EN "Trick or treat!", ES "¡Truco o trato!". Joyfully "unlock" treat.
+- **"Repeat After the Ghost"**
+  Make sounds and ask to repeat: ghost "ooooo", witch "hee-hee-hee", monster "grr-arr". Praise attempts.
+
+## Response Categories (use one at a time)
+- **Greetings:** RU: "Добро пожаловать, смельчаки!" / EN: "Welcome, brave souls!"
+- **Light Teasing:** RU: "Кто здесь самый страшный?.. ой, это же я!" / EN: "Who's the scariest here… oh wait, it's me!"
+- **Questions:** RU: "Вы за ведьм или за вампиров?" / EN: "Team vampires or team werewolves?"
+- **Jokes:** RU: "Почему скелеты не дерутся? У них нет кишок!" / EN: "Why don't skeletons fight? They don't have the guts!"
+- **Compliments:** RU: "Классный костюм!" / EN: "Awesome costume!" (general if costume unclear)
+- **Farewell:** RU: "Страшно весёлой ночи!" / EN: "Have a spooky night!"
+
+## Voice Acting (via set_audio_effects)
+- Monsters/demons: pitch DOWN + reverb (maybe light distortion).
+- Witches/small creatures: pitch UP, maybe chorus.
+- Ghost: reverb.
+- Scare scene: "BOO!" with heavy distortion + pitch DOWN **only for that word**, then immediately return normal.
+- **Sharp changes:** allowed for short phrases, then return neutral.
+
+## Pauses and Sound
+- Keep 0.5-1.0s pauses before punchline/"BOO!" for suspense.
+- If **play_sfx** available: can request "creak", "owl", "witch_laugh". If not — imitate with voice.
+
+## Lighting Effects for Atmosphere
+You can control colored lights to enhance the spooky atmosphere! Use lighting to amplify scares and create mood:
+- **UV Light (Aurora):** Blinking UV creates ghostly glowing effects. Use for mysterious/scary moments.
+- **Flood Light (RGB):** Can set single colors or create sequences:
+  - Red: Danger, demons, scary moments
+  - Blue: Ghost, cold, eerie atmosphere
+  - Purple: Witch, magic, mystical
+  - Orange: Halloween, pumpkin glow
+  - Color sequences: Red-white-red-white for police/alarm effect, or gradual color changes for atmosphere
+  - Blinking: Fast blinking for scares, slow for mystery
+- **When to use:** During scary stories, before "BOO!", during mini-games, to match voice effects
+- **Keep it short:** 5-10 seconds of effects, then return to normal or subtle lighting
+- Don't overuse - save for key moments to maximize impact!
+
+## Length and Rhythm
+- Short by default. If guests linger — offer **one more** bit from different category.
+- Don't spam: 1 activity → guest reaction → different activity.
+
+## Safety
+- No gore, threats, toxicity. Light scares immediately diffused with joke.
+- Be friendly and inclusive.
+
+## If You Didn't Hear
+RU: "Ой, мои косточки скрипят — повторите, пожалуйста?"
+EN: "Pardon my rattling bones—could you say that again?"
+
+# Available Music Files
+{music_list}"""
+
+VISION_PROMPT = """
+
+## Vision and Realism (CRITICAL)
+⚠️ DO NOT HALLUCINATE! ⚠️
+
+1. FIRST **look_at_camera**, describe only what you ACTUALLY SEE.
+2. If unsure — be vague: "Looks like we have guests!"
+3. DON'T invent colors, age, costumes. Can joke: "My skeleton eyes don't see too clearly!"
+4. Better vague than wrong."""
+
+class UdpAudioProtocol(asyncio.DatagramProtocol):
+    """Feeds ESP32 mic datagrams to the bot as soon as the event loop sees them"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def datagram_received(self, data, addr):
+        try:
+            self.bot.handle_udp_packet(data, addr)
+        except Exception as e:
+            print(f"❌ UDP RX error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def error_received(self, exc):
+        print(f"❌ UDP RX error: {exc}")
+
+class StreamResampler:
+    """Polyphase rational resampler that carries filter history across chunks.
+
+    Resampling each chunk on its own zero-pads both ends, which restarts the
+    filter at every frame boundary; here the tail of the previous chunk feeds
+    the start of the next, so chunked output matches one continuous stream.
+    """
+
+    def __init__(self, up, down, taps):
+        self.up = up
+        self.down = down
+        self.taps = np.asarray(taps, dtype=np.float64) * up  # Unity passband gain after zero-stuffing
+        self.min_history = -(-(len(self.taps) - 1) // up)  # Input samples needed to fill the filter
+        self.history = np.zeros(self.min_history + down - 1, dtype=np.float64)
+        self.total_in = 0
+        self.total_out = 0
+
+    def process(self, x):
+        """Resample one chunk; returns float64 samples (causal, no group-delay trim)"""
+        # Pick a history length that puts the chunk origin on the output (down) grid
+        history_len = self.min_history + (self.total_in - self.min_history) % self.down
+        x_all = np.concatenate((self.history[len(self.history) - history_len:], x))
+        y = signal.upfirdn(self.taps, x_all, self.up, self.down)
+
+        # Emit outputs whose positions fall inside the new input; earlier ones were emitted last call
+        origin = (self.total_in - history_len) * self.up // self.down
+        end = -(-(self.total_in + len(x)) * self.up // self.down)
+        out = y[self.total_out - origin:end - origin]
+
+        self.total_in += len(x)
+        self.total_out = end
+        if len(x_all) >= len(self.history):
+            self.history[:] = x_all[len(x_all) - len(self.history):]
+        else:
+            self.history = np.concatenate((self.history[len(x_all):], x_all))
+        return out
+
+class SampleRing:
+    """Contiguous int16 ring buffer for mic audio; the oldest samples are overwritten when full.
+
+    read() returns a view into the ring when the span doesn't wrap, so callers
+    must consume it before the producer runs again.
+    """
+
+    def __init__(self, capacity):
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity:]
+        n = len(samples)
+
+        tail = (self.head + self.count) % self.capacity
+        first = min(n, self.capacity - tail)
+        self.buffer[tail:tail + first] = samples[:first]
+        self.buffer[:n - first] = samples[first:]
+
+        overflow = self.count + n - self.capacity
+        if overflow > 0:
+            self.head = (self.head + overflow) % self.capacity
+            self.count = self.capacity
+        else:
+            self.count += n
+
+    def read(self, max_samples):
+        n = min(max_samples, self.count)
+        end = self.head + n
+        if end <= self.capacity:
+            samples = self.buffer[self.head:end]
+        else:
+            samples = np.concatenate((self.buffer[self.head:], self.buffer[:end - self.capacity]))
+        self.head = end % self.capacity
+        self.count -= n
+        return samples
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+class PlaybackRing:
+    """Fixed-capacity FIFO of preallocated byte slots for playback audio.
+
+    Single producer (OpenAI receive task) and single consumer (playback task),
+    both on the event loop. popleft() returns a memoryview into the slot, valid
+    until the producer wraps around to that slot again.
+    """
+
+    def __init__(self, capacity, slot_size):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.slots = [bytearray(slot_size) for _ in range(capacity)]
+        self.views = [memoryview(slot) for slot in self.slots]
+        self.lengths = [0] * capacity
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, data):
+        """Copy data into the next free slot(s), splitting at slot_size; all-or-nothing, False if it doesn't fit"""
+        data = memoryview(data).cast('B')
+        if self.count + -(-len(data) // self.slot_size) > self.capacity:
+            return False  # Never enqueue a truncated delta that callers would count as dropped
+        for offset in range(0, len(data), self.slot_size):
+            piece = data[offset:offset + self.slot_size]
+            tail = (self.head + self.count) % self.capacity
+            self.views[tail][:len(piece)] = piece
+            self.lengths[tail] = len(piece)
+            self.count += 1
+        return True
+
+    def popleft(self):
+        if not self.count:
+            raise IndexError("pop from an empty PlaybackRing")
+        head = self.head
+        self.head = (head + 1) % self.capacity
+        self.count -= 1
+        return self.views[head][:self.lengths[head]]
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
 class RealtimeVoiceBotUDP:
     def __init__(self, voice="alloy", audio_effects=None, output_mode="esp32_udp",
                  enable_camera=True, enable_mqtt=True, enable_jaw=True, enable_eyes=True,
                  esp32_ip_override=None, mqtt_server_override=None, mqtt_port_override=None,
-                 log_conversation=False):
+                 log_conversation=False, verbose=False):
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.voice = voice
         self.url = "wss://api.openai.com/v1/realtime?model=gpt-realtime-2025-08-28"
@@ -60,6 +412,7 @@ class RealtimeVoiceBotUDP:
         self.enable_jaw = enable_jaw and enable_mqtt  # Jaw requires MQTT
         self.enable_eyes = enable_eyes and enable_mqtt  # Eyes require MQTT
         self.log_conversation = log_conversation
+        self.verbose = verbose  # Per-frame/per-second stream stats (stdout writes on the audio path)
 
         # Camera setup (only if enabled)
         self.use_webcam = os.getenv("USE_WEBCAM", "false").lower() == "true"
@@ -99,6 +452,16 @@ class RealtimeVoiceBotUDP:
             self.pedalboard = None
             if audio_effects and not PEDALBOARD_AVAILABLE:
                 print("⚠️  Audio effects requested but Pedalboard not available")
+        # Plain bool checked per delta: with no effects the audio stays int16 and skips Pedalboard entirely
+        self.audio_effects_active = self.pedalboard is not None
+
+        # Resampled int16 samples reused across sends/deltas (grown on demand)
+        self.uplink_i16 = np.empty(0, dtype=np.int16)
+        self.downlink_i16 = np.empty(0, dtype=np.int16)
+
+        # Scratch buffers for the effects path (grown on demand by apply_audio_effects)
+        self.fx_scratch_f32 = np.empty(0, dtype=np.float32)
+        self.fx_scratch_i16 = np.empty(0, dtype=np.int16)
 
         # Audio settings
         self.ESP32_RATE = 16000   # ESP32 sample rate
@@ -108,6 +471,19 @@ class RealtimeVoiceBotUDP:
         self.ESP32_BITS_TX = 16   # ESP32 receives 16-bit
         self.OPENAI_RATE = 24000  # OpenAI Realtime API uses 24kHz
 
+        # Polyphase 16kHz <-> 24kHz resampling (3:2), Kaiser low-pass designed once
+        rate_gcd = math.gcd(self.ESP32_RATE, self.OPENAI_RATE)
+        self.RESAMPLE_UP = self.OPENAI_RATE // rate_gcd    # 3
+        self.RESAMPLE_DOWN = self.ESP32_RATE // rate_gcd   # 2
+        self.resample_filter = signal.firwin(
+            20 * max(self.RESAMPLE_UP, self.RESAMPLE_DOWN) + 1,
+            1.0 / max(self.RESAMPLE_UP, self.RESAMPLE_DOWN),
+            window=('kaiser', 8.6)
+        )
+        # Stateful resamplers, one per direction, so frame boundaries don't restart the filter
+        self.uplink_resampler = StreamResampler(self.RESAMPLE_UP, self.RESAMPLE_DOWN, self.resample_filter)
+        self.downlink_resampler = StreamResampler(self.RESAMPLE_DOWN, self.RESAMPLE_UP, self.resample_filter)
+
         # ESP32 uses 40ms frames (mic TX and speaker RX)
         self.FRAME_MS_RX = 40  # ESP32 sends 40ms mic frames
         self.FRAME_MS_TX = 40  # ESP32 expects 40ms speaker frames
@@ -127,22 +503,34 @@ class RealtimeVoiceBotUDP:
         # };
         self.HEADER_FORMAT = '<BBHIII'  # little-endian: byte, byte, short, int, int, int
         self.HEADER_SIZE = 16  # 1+1+2+4+4+4 = 16 bytes
+        self.header_struct = struct.Struct(self.HEADER_FORMAT)  # Compiled once, reused per packet
+        self.UDP_RCVBUF_TARGET = 4 * 1024 * 1024  # Mic RX socket buffer (~50 s of 16 kHz mono frames)
 
         self.websocket = None
+        self.loop = None  # Running event loop, cached in run()
         self.camera = None
+        self.camera_lock = threading.Lock()  # Guards the last_camera_frame hand-off only, never held across I/O
+        self.camera_thread = None
+        self.camera_running = False
+        self.last_camera_frame = None  # Latest decoded frame published by camera_grab_loop
+        self.CAMERA_DECODE_INTERVAL = 1 / 12  # Decode/publish at ~12 Hz; grab() still drains every frame
         self.last_camera_capture = 0  # Timestamp of last camera capture
 
         # Create logs directory
-        self.logs_dir = "logs"
-        os.makedirs(self.logs_dir, exist_ok=True)
+        self.logs_dir = Path("logs")
+        self.logs_dir.mkdir(exist_ok=True)
 
         # Conversation logging setup
         if self.log_conversation:
-            self.conversation_logs_dir = "conversation_logs"
-            os.makedirs(self.conversation_logs_dir, exist_ok=True)
+            self.conversation_logs_dir = Path("conversation_logs")
+            self.conversation_logs_dir.mkdir(exist_ok=True)
             timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            self.conversation_log_file = os.path.join(self.conversation_logs_dir, f"conversation_{timestamp}.json")
+            self.conversation_log_file = self.conversation_logs_dir / f"conversation_{timestamp}.json"
             self.conversation_log = []
+            # Entries are queued by the receive loop and written in batches by conversation_log_writer()
+            self.conversation_log_queue = asyncio.Queue()
+            self.conversation_log_task = None
+            self.conversation_log_lock = threading.Lock()  # File writes run in a worker thread; keep them whole and ordered
             print(f"📝 Conversation logging enabled: {self.conversation_log_file}")
 
         # Audio device selection for speaker mode
@@ -178,13 +566,85 @@ class RealtimeVoiceBotUDP:
             self.udp_rx_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.udp_rx_socket.bind(('0.0.0.0', self.udp_receive_port))
             self.udp_rx_socket.setblocking(False)
+            # Headroom so GC/scheduler/inference stalls don't silently drop mic frames
+            self.udp_rx_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.UDP_RCVBUF_TARGET)
+            self.udp_rx_transport = None  # Datagram endpoint, created in receive_udp_audio()
+            self.udp_rx_reader = False    # recvmmsg reader registered on the loop
+            self.rx_packet_count = 0
+            self.rx_bad_packets = 0
+
+            # recvmmsg batch: fixed receive slots, iovecs and source addresses allocated once
+            if RECVMMSG_AVAILABLE:
+                self.max_rx_batch = 16
+                self.rx_slot_size = 2048  # Larger than any ESP32 packet (16-byte header + 1280 bytes)
+                self.rx_buf = bytearray(self.rx_slot_size * self.max_rx_batch)
+                self.rx_view = memoryview(self.rx_buf)
+                self.rx_iov = (_IOVec * self.max_rx_batch)()
+                self.rx_addrs = (_SockAddrIn * self.max_rx_batch)()
+                self.rx_hdrs = (_MMsgHdr * self.max_rx_batch)()
+                rx_base = ctypes.addressof((ctypes.c_char * len(self.rx_buf)).from_buffer(self.rx_buf))
+                for i in range(self.max_rx_batch):
+                    self.rx_iov[i].iov_base = rx_base + i * self.rx_slot_size
+                    self.rx_iov[i].iov_len = self.rx_slot_size
+                    self.rx_hdrs[i].msg_hdr.msg_iov = ctypes.pointer(self.rx_iov[i])
+                    self.rx_hdrs[i].msg_hdr.msg_iovlen = 1
+                    self.rx_hdrs[i].msg_hdr.msg_name = ctypes.addressof(self.rx_addrs[i])
 
             self.udp_tx_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp_tx_socket.setblocking(False)  # Sent from the event loop - never block it on a full buffer
+            self.udp_tx_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 128 * 1024)
+            try:
+                # DSCP EF (expedited forwarding) - low-latency marking for speaker audio on the LAN
+                self.udp_tx_socket.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, 0xB8)
+            except (AttributeError, OSError):
+                pass
+            # Kernel may clamp - log what we actually got. Linux reports double the usable
+            # size (bookkeeping overhead), capped by net.core.rmem_max; halve it so log and check agree
+            rx_granted = self.udp_rx_socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            tx_granted = self.udp_tx_socket.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+            if sys.platform.startswith("linux"):
+                rx_granted //= 2
+                tx_granted //= 2
+            print(f"📶 UDP buffers: RX {rx_granted // 1024} KiB (requested {self.UDP_RCVBUF_TARGET // 1024}), "
+                  f"TX {tx_granted // 1024} KiB")
+            if rx_granted < self.UDP_RCVBUF_TARGET:
+                print(f"⚠️  UDP RX buffer clamped to {rx_granted // 1024} KiB "
+                      f"(raise net.core.rmem_max to {self.UDP_RCVBUF_TARGET} for full headroom)")
+            # TX socket is connect()ed to the ESP32 once its IP is known: plain send(), no per-packet route lookup
+            self.esp32_addr = (self.esp32_ip, self.udp_send_port)
+            self.tx_connected = False
+            self.tx_errors = 0  # Frames dropped on send errors since the last warning
+            self.last_tx_error_report = 0.0
+            # Scatter-send header + payload without concatenating (sendmsg is POSIX-only)
+            self.use_sendmsg = hasattr(self.udp_tx_socket, "sendmsg")
+            self.max_tx_batch = 8
+
+            # Headers are packed in place into one persistent buffer (one 16-byte slot per batched frame)
+            self.tx_header_buf = bytearray(self.HEADER_SIZE * self.max_tx_batch)
+            self.tx_header_view = memoryview(self.tx_header_buf)
+            # Whole-packet buffer for the sendto() fallback where sendmsg is unavailable
+            self.tx_packet_buf = bytearray(self.HEADER_SIZE + self.FRAME_BYTES_TX)
+            self.tx_packet_view = memoryview(self.tx_packet_buf)
+
+            # sendmmsg batch: message headers and iovecs are allocated once; header iovecs point
+            # at fixed tx_header_buf slots, payload iovecs are re-pointed per call
+            if SENDMMSG_AVAILABLE:
+                self.mmsg_iov = (_IOVec * (2 * self.max_tx_batch))()
+                self.mmsg_hdrs = (_MMsgHdr * self.max_tx_batch)()
+                header_base = ctypes.addressof((ctypes.c_char * len(self.tx_header_buf)).from_buffer(self.tx_header_buf))
+                for i in range(self.max_tx_batch):
+                    self.mmsg_iov[2 * i].iov_base = header_base + i * self.HEADER_SIZE
+                    self.mmsg_iov[2 * i].iov_len = self.HEADER_SIZE
+                    self.mmsg_hdrs[i].msg_hdr.msg_iov = ctypes.cast(ctypes.byref(self.mmsg_iov, 2 * i * ctypes.sizeof(_IOVec)), ctypes.POINTER(_IOVec))
+                    self.mmsg_hdrs[i].msg_hdr.msg_iovlen = 2
 
             # Packet tracking
             self.tx_sequence = 0
             self.ssrc = 0xFAAC01
 
+            if self.esp32_ip and self.esp32_ip != "192.168.2.xxx":
+                self.connect_udp_tx()
+
             self.pyaudio_instance = None
             self.output_stream = None
             self.input_stream = None
@@ -202,6 +662,14 @@ class RealtimeVoiceBotUDP:
                 self.SPEAKER_CHANNELS = 1
                 self.SPEAKER_RATE = 24000  # Native OpenAI rate
 
+                # PortAudio pulls from this ring in callback mode; send_audio_to_speakers only tops it up
+                self.speaker_ring = SampleRing(self.SPEAKER_RATE)  # 1s max
+                self.speaker_ring_lock = threading.Lock()
+                self.speaker_space_event = asyncio.Event()
+                self.speaker_space_waiting = False  # Producer is parked on speaker_space_event
+                self.speaker_high_water = 2 * self.SPEAKER_CHUNK  # Keep ~85ms queued ahead of the device
+                self.pa_continue = pyaudio.paContinue
+
                 print("🔊 Using local speakers for audio output")
             except ImportError:
                 print("❌ PyAudio not installed. Install with: pip install pyaudio")
@@ -232,31 +700,48 @@ class RealtimeVoiceBotUDP:
 
         # Output volume control (0.0 to 1.0)
         self.output_volume = 0.2  # Start at 20%
+        # ESP32 volume payloads for every 5% step, encoded once (network-thread callback stays format-free)
+        self.volume_payloads = {i / 20: str(i / 20).encode() for i in range(21)}
 
-        # Audio buffers - увеличен для плавного приема
-        self.audio_input_buffer = deque(maxlen=200)
-        self.playback_buffer = deque()  # Buffer for smooth playback (no hard limit)
-        self.max_buffer_size = 1000  # Soft limit: 20 seconds max
+        # Jaw payloads rendered once: 64-step open positions (speakers) and 20-150ms pulses (ESP32)
+        self.JAW_STEPS = 64
+        self.jaw_position_payloads = tuple(f"{i / self.JAW_STEPS:.3f}".encode() for i in range(self.JAW_STEPS + 1))
+        self.jaw_pulse_payloads = {ms: str(ms).encode() for ms in range(20, 151)}
 
-        # Initialize pygame mixer for background music
-        pygame.mixer.init()
-        self.sounds_dir = "sounds"
+        # Audio buffers - увеличен для плавного приема
+        input_chunk_samples = self.FRAME_SAMPLES_RX if self.output_mode == "esp32_udp" else self.SPEAKER_CHUNK
+        self.audio_input_buffer = SampleRing(200 * input_chunk_samples)  # 200 chunks, oldest dropped
+        self.audio_input_event = asyncio.Event()  # Set by mic/UDP producers when input is queued
+        self.max_input_batch = 8 * input_chunk_samples  # Max input samples combined into one OpenAI send
+        self.max_buffer_size = 1000  # Hard limit: 40 seconds of 40ms ESP32 frames
+        # Preallocated playback slots: one ESP32 frame each, or one PyAudio chunk in speaker mode
+        playback_slot_size = self.FRAME_BYTES_TX if self.output_mode == "esp32_udp" else self.SPEAKER_CHUNK * 2
+        self.playback_buffer = PlaybackRing(self.max_buffer_size, playback_slot_size)
+        self.jaw_scratch = np.empty(playback_slot_size // 2, dtype=np.int32)  # |sample| per frame, int32 so -32768 doesn't wrap
+        self.playback_event = asyncio.Event()  # Set by receive_from_openai when frames are queued
+        self.playback_dropped = 0  # Frames dropped on a full buffer since the last warning
+        self.last_drop_report = 0.0
+
+        # Background music - pygame mixer (and its SDL audio thread) starts on first play
+        self.mixer_initialized = False
+        self.sounds_dir = Path("sounds")
         self.music_playing = False
         self.music_volume_normal = 1.0
         self.music_volume_ducked = 0.3
-        pygame.mixer.music.set_volume(self.music_volume_normal)
+        self.music_volume_target = self.music_volume_normal
+        self.music_volume_task = None  # In-flight set_volume off the event loop (coalesces duck/restore)
 
         # Auto-detect all MP3 files
+        # Sorted once; reused for the prompt, the tool schema and lookups
         self.available_sounds = []
-        if os.path.exists(self.sounds_dir):
-            for filename in os.listdir(self.sounds_dir):
-                if filename.endswith('.mp3'):
-                    self.available_sounds.append(filename)
+        if self.sounds_dir.is_dir():
+            with os.scandir(self.sounds_dir) as entries:
+                self.available_sounds = sorted(entry.name for entry in entries if entry.name.endswith('.mp3'))
 
         print(f"🎵 Loaded {len(self.available_sounds)} sound files")
 
         # Build music list for prompt
-        music_list = "\n".join([f"- {filename}" for filename in sorted(self.available_sounds)]) if self.available_sounds else "(No music files found in sounds/ folder)"
+        music_list = "\n".join([f"- {filename}" for filename in self.available_sounds]) if self.available_sounds else "(No music files found in sounds/ folder)"
 
         # Current voice
         self.current_voice = "alloy"
@@ -305,137 +790,15 @@ class RealtimeVoiceBotUDP:
                 print("⚠️  Smart Flood Light control disabled (credentials not in .env)")
             self.flood_light_enabled = False
 
-        # Build interaction start instructions based on camera availability
-        if self.enable_camera:
-            interaction_start = """## Start of Each Interaction (strict sequence)
-1. FIRST call **look_at_camera** tool, THEN speak.
-2. Brief intro: "I'm Franky, the talking skull!" (in guest's language).
-3. Ask for name and **STOP**. Wait for answer, don't invent.
-4. After answer: "Oh, [name]! That sounds truly spooky/cool!"
-5. Offer treat:
-   - RU: "Я приготовила для вас угощения… хотите?"
-   - EN: "I cooked up some treats… want one?"
-   - ES: "He preparado dulces… ¿quieren?"
-6. Invite: "Come inside, let's have fun!" (in guest's language).
-7. Proceed to **ONE** short bit (joke/mini-game/riddle), ≤ 15-20 sec."""
-        else:
-            interaction_start = """## Start of Each Interaction (strict sequence)
-1. Brief intro: "I'm Franky, the talking skull!" (in guest's language).
-2. Ask for name and **STOP**. Wait for answer, don't invent.
-3. After answer: "Oh, [name]! That sounds truly spooky/cool!"
-4. Offer treat:
-   - RU: "Я приготовила для вас угощения… хотите?"
-   - EN: "I cooked up some treats… want one?"
-   - ES: "He preparado dulces… ¿quieren?"
-5. Invite: "Come inside, let's have fun!" (in guest's language).
-6. Proceed to **ONE** short bit (joke/mini-game/riddle), ≤ 15-20 sec."""
-
-        # System prompt
-        self.system_prompt = f"""
-## Who You Are
-You are Franky, a talking Halloween skull. Friendly, funny, with a playful "spooky" twist. Your goal is to lightly scare, amuse, and engage guests in short interactions. Keep responses SHORT by default (~1-2 sentences), but continue if guests are clearly interested.
-
-## Multilingual (REQUIRED)
-- **Auto-mirror** the guest's language from their speech. If unsure, greet briefly in English and ask which language they prefer.
-- Use **call-and-response** phrases so guests can **finish** them (language-specific examples below).
-- Split into simple sentences and speak slightly slower if language switches.
-- ⚠️ **NEVER translate jokes from one language to another!** Jokes don't work when translated. If guest speaks Russian, tell RUSSIAN jokes. If English, tell ENGLISH jokes. Create NEW jokes in guest's language, don't translate!
-
-{interaction_start}
-
-## Interaction Rotation (randomness and variety)
-Each time choose a **different** type of bit, don't repeat consecutively:
-- Joke/pun (skeleton/Halloween themed).
-- Light scare "BOO!" with immediate friendly recovery.
-- Kids riddle.
-- Mini-game (below).
-- Costume compliment (general if unsure of details).
-
-## "Skull Starts — Guests Finish" (language-specific)
-**Russian (RU)**
-- "Сладость или…" → "гадость!"
-- "Абра-ка…" → "дабра!"
-- "Счастливого Хэлло…" → "уина!"
-- "Тук-тук!" → "Кто там?" → "Череп!" → "Череп кто?" → "Череп, который пугает — БУ!"
-
-**English (EN)**
-- "Trick or…" → "treat!"
-- "Abra-ca…" → "dabra!"
-- "Happy Hallow…" → "ween!"
-- "Knock, knock!" → "Who's there?" → "Skull!" → "Skull who?" → "Skull that scares you—BOO!"
-
-**Spanish (ES)**
-- "Truco o…" → "trato!"
-- "A la de una, a la de dos… a la de…" → "¡tres!"
-- "Feliz Hallo…" → "ween!"
-
-If guests are small kids, give hint: "Let's say together: Trick or… (pause)".
-
-## Mini-Games (20-60 sec)
-- **"Treat or Spell?"**
-  Ask for "password": RU "Сладость или гадость!", EN "Trick or treat!", ES "¡Truco o trato!". Joyfully "unlock" treat.
-- **"Repeat After the Ghost"**
-  Make sounds and ask to repeat: ghost "ooooo", witch "hee-hee-hee", monster "grr-arr". Praise attempts.
-
-## Response Categories (use one at a time)
-- **Greetings:** RU: "Добро пожаловать, смельчаки!" / EN: "Welcome, brave souls!"
-- **Light Teasing:** RU: "Кто здесь самый страшный?.. ой, это же я!" / EN: "Who's the scariest here… oh wait, it's me!"
-- **Questions:** RU: "Вы за ведьм или за вампиров?" / EN: "Team vampires or team werewolves?"
-- **Jokes:** RU: "Почему скелеты не дерутся? У них нет кишок!" / EN: "Why don't skeletons fight? They don't have the guts!"
-- **Compliments:** RU: "Классный костюм!" / EN: "Awesome costume!" (general if costume unclear)
-- **Farewell:** RU: "Страшно весёлой ночи!" / EN: "Have a spooky night!"
-
-## Voice Acting (via set_audio_effects)
-- Monsters/demons: pitch DOWN + reverb (maybe light distortion).
-- Witches/small creatures: pitch UP, maybe chorus.
-- Ghost: reverb.
-- Scare scene: "BOO!" with heavy distortion + pitch DOWN **only for that word**, then immediately return normal.
-- **Sharp changes:** allowed for short phrases, then return neutral.
-
-## Pauses and Sound
-- Keep 0.5-1.0s pauses before punchline/"BOO!" for suspense.
-- If **play_sfx** available: can request "creak", "owl", "witch_laugh". If not — imitate with voice.
-
-## Lighting Effects for Atmosphere
-You can control colored lights to enhance the spooky atmosphere! Use lighting to amplify scares and create mood:
-- **UV Light (Aurora):** Blinking UV creates ghostly glowing effects. Use for mysterious/scary moments.
-- **Flood Light (RGB):** Can set single colors or create sequences:
-  - Red: Danger, demons, scary moments
-  - Blue: Ghost, cold, eerie atmosphere
-  - Purple: Witch, magic, mystical
-  - Orange: Halloween, pumpkin glow
-  - Color sequences: Red-white-red-white for police/alarm effect, or gradual color changes for atmosphere
-  - Blinking: Fast blinking for scares, slow for mystery
-- **When to use:** During scary stories, before "BOO!", during mini-games, to match voice effects
-- **Keep it short:** 5-10 seconds of effects, then return to normal or subtle lighting
-- Don't overuse - save for key moments to maximize impact!
-
-## Length and Rhythm
-- Short by default. If guests linger — offer **one more** bit from different category.
-- Don't spam: 1 activity → guest reaction → different activity.
-
-## Safety
-- No gore, threats, toxicity. Light scares immediately diffused with joke.
-- Be friendly and inclusive.
-
-## If You Didn't Hear
-RU: "Ой, мои косточки скрипят — повторите, пожалуйста?"
-EN: "Pardon my rattling bones—could you say that again?"
-
-# Available Music Files
-{music_list}"""
+        # System prompt (module-level template, only the variable parts are filled in)
+        self.system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+            interaction_start=INTERACTION_START_CAMERA if self.enable_camera else INTERACTION_START_NO_CAMERA,
+            music_list=music_list
+        )
 
         # Add Vision section only if camera is enabled
         if self.enable_camera:
-            self.system_prompt += """
-
-## Vision and Realism (CRITICAL)
-⚠️ DO NOT HALLUCINATE! ⚠️
-
-1. FIRST **look_at_camera**, describe only what you ACTUALLY SEE.
-2. If unsure — be vague: "Looks like we have guests!"
-3. DON'T invent colors, age, costumes. Can joke: "My skeleton eyes don't see too clearly!"
-4. Better vague than wrong."""
+            self.system_prompt += VISION_PROMPT
 
         # Build tools list based on enabled features
         self.tools = []
@@ -494,7 +857,7 @@ EN: "Pardon my rattling bones—could you say that again?"
                     "properties": {
                         "filename": {
                             "type": "string",
-                            "description": f"Name of the music file to play. Must be one of: {', '.join(sorted(self.available_sounds)) if self.available_sounds else 'No music files available'}"
+                            "description": f"Name of the music file to play. Must be one of: {', '.join(self.available_sounds) if self.available_sounds else 'No music files available'}"
                         }
                     },
                     "required": ["filename"]
@@ -583,6 +946,46 @@ EN: "Pardon my rattling bones—could you say that again?"
                 }
             })
 
+        # Tool name -> handler coroutine (call_id, arguments), looked up per function call
+        self.tool_handlers = {
+            "look_at_camera": self.tool_look_at_camera,
+            "set_audio_effects": self.tool_set_audio_effects,
+            "play_scary_music": self.tool_play_scary_music,
+            "stop_music": self.tool_stop_music,
+        }
+
+        # Realtime event type -> handler coroutine (msg); response.audio.delta stays inline in receive_from_openai
+        self.event_handlers = {
+            "response.function_call_arguments.done": self.on_function_call,
+            "input_audio_buffer.speech_started": self.on_speech_started,
+            "input_audio_buffer.speech_stopped": self.on_speech_stopped,
+            "conversation.item.input_audio_transcription.completed": self.on_user_transcript,
+            "response.audio_transcript.done": self.on_franky_transcript,
+            "error": self.on_openai_error,
+        }
+
+        # session.update is identical on every (re)connect - serialize it once
+        self.session_update_json = json.dumps({
+            "type": "session.update",
+            "session": {
+                "modalities": ["text", "audio"],
+                "instructions": self.system_prompt,
+                "voice": self.voice,
+                "input_audio_format": "pcm16",
+                "output_audio_format": "pcm16",
+                "input_audio_transcription": {"model": "whisper-1"},
+                "turn_detection": {
+                    "type": "server_vad",
+                    "threshold": 0.5,
+                    "prefix_padding_ms": 300,
+                    "silence_duration_ms": 500
+                },
+                "tools": self.tools,
+                "tool_choice": "auto",
+                "temperature": 0.8,
+            }
+        }, separators=(',', ':'))
+
     def on_mqtt_connect(self, client, userdata, flags, reason_code, properties):
         """MQTT connection callback - only for control"""
         if reason_code == 0:
@@ -599,88 +1002,199 @@ EN: "Pardon my rattling bones—could you say that again?"
         if msg.topic == self.volume_topic:
             try:
                 value = float(msg.payload.decode('utf-8'))
-                # Clamp between 0.0 and 1.0
-                self.output_volume = max(0.0, min(1.0, value))
+                # Clamp between 0.0 and 1.0, quantized to 5% steps
+                self.output_volume = round(max(0.0, min(1.0, value)) * 20) / 20
                 print(f"🔊 Output volume set to {self.output_volume * 100:.0f}%")
 
-                # Forward volume command to ESP32 via MQTT
+                # Forward volume command to ESP32 via MQTT (pre-encoded payload)
                 # ESP32 will control its amplifier directly
-                client.publish("esp32/volume", str(self.output_volume))
+                client.publish("esp32/volume", payload=self.volume_payloads[self.output_volume], qos=0, retain=False)
             except ValueError:
                 print(f"⚠️  Invalid volume value: {msg.payload.decode('utf-8')}")
 
-    def send_udp_packet(self, audio_data):
-        """Send audio packet to ESP32 via UDP with header"""
-        if not self.esp32_ip or self.esp32_ip == "192.168.2.xxx":
-            return  # ESP32 IP not yet detected
-
-        # Build header
-        header = struct.pack(
-            self.HEADER_FORMAT,
+    def pack_udp_header(self, slot, payload_len):
+        """Pack the next UDP packet header into tx_header_buf slot and advance the TX sequence"""
+        self.header_struct.pack_into(
+            self.tx_header_buf,
+            slot * self.HEADER_SIZE,
             0x01,                    # type: audio packet
             0x00,                    # flags
-            len(audio_data),         # payload_len
+            payload_len,             # payload_len
             self.ssrc,               # ssrc
-            int(asyncio.get_event_loop().time() * 1000) & 0xFFFFFFFF,  # timestamp
+            (time.monotonic_ns() // 1_000_000) & 0xFFFFFFFF,  # timestamp (ms, monotonic, wraps at 32 bits)
             self.tx_sequence         # sequence
         )
 
         self.tx_sequence = (self.tx_sequence + 1) & 0xFFFFFFFF
+        return self.tx_header_view[slot * self.HEADER_SIZE:(slot + 1) * self.HEADER_SIZE]
 
-        # Send packet
-        packet = header + audio_data
-        self.udp_tx_socket.sendto(packet, (self.esp32_ip, self.udp_send_port))
+    def connect_udp_tx(self):
+        """Point the connected TX socket at the current ESP32 address"""
+        self.esp32_addr = (self.esp32_ip, self.udp_send_port)
+        try:
+            self.udp_tx_socket.connect(self.esp32_addr)
+            self.tx_connected = True
+        except OSError as e:
+            print(f"⚠️  Cannot reach ESP32 at {self.esp32_ip}: {e}")
+            self.tx_connected = False
+
+    def send_packed_udp(self, header, audio_data):
+        """Send an already packed header plus payload to the ESP32"""
+        try:
+            if self.use_sendmsg:
+                self.udp_tx_socket.sendmsg([header, audio_data])
+            else:
+                # Assemble in the persistent packet buffer instead of concatenating
+                packet_len = self.HEADER_SIZE + len(audio_data)
+                self.tx_packet_view[:self.HEADER_SIZE] = header
+                self.tx_packet_view[self.HEADER_SIZE:packet_len] = audio_data
+                self.udp_tx_socket.send(self.tx_packet_view[:packet_len])
+        except BlockingIOError:
+            pass  # Send buffer full - late audio is useless, drop frame
+        except OSError as e:
+            # Connected socket surfaces async ICMP errors (refused/host or net unreachable
+            # while the ESP32 reboots or Wi-Fi drops) - drop the frame, keep streaming
+            self.report_tx_error(e.errno, 1)
 
-    async def receive_udp_audio(self):
-        """Receive audio from ESP32 via UDP"""
-        loop = asyncio.get_event_loop()
-        packet_count = 0
+    def send_udp_packet(self, audio_data):
+        """Send audio packet to ESP32 via UDP with header"""
+        if not self.tx_connected:
+            return  # ESP32 IP not yet detected
 
-        while True:
-            try:
-                data, addr = await loop.sock_recvfrom(self.udp_rx_socket, 4096)
+        self.send_packed_udp(self.pack_udp_header(0, len(audio_data)), audio_data)
 
-                # Auto-detect ESP32 IP from first packet
-                if not self.esp32_ip or self.esp32_ip == "192.168.2.xxx":
-                    self.esp32_ip = addr[0]
-                    print(f"🎯 ESP32 detected at {self.esp32_ip}")
+    def send_udp_packets(self, frames):
+        """Send several audio frames to ESP32, batched into one sendmmsg() call when available"""
+        if not self.tx_connected:
+            return  # ESP32 IP not yet detected
 
-                # Parse packet
-                if len(data) < self.HEADER_SIZE:
-                    print(f"⚠️  Packet too small: {len(data)} bytes")
-                    continue
+        if not SENDMMSG_AVAILABLE or len(frames) == 1:
+            for frame in frames:
+                self.send_udp_packet(frame)
+            return
 
-                header = struct.unpack(self.HEADER_FORMAT, data[:self.HEADER_SIZE])
-                packet_type, flags, payload_len, ssrc, timestamp, sequence = header
+        # Payloads must stay referenced until the syscall returns
+        batch = frames[:self.max_tx_batch]
+        for i, frame in enumerate(batch):
+            self.pack_udp_header(i, len(frame))
+            if isinstance(frame, bytes):
+                self.mmsg_iov[2 * i + 1].iov_base = ctypes.cast(ctypes.c_char_p(frame), ctypes.c_void_p)
+            else:  # memoryview into a PlaybackRing slot
+                self.mmsg_iov[2 * i + 1].iov_base = ctypes.addressof((ctypes.c_char * len(frame)).from_buffer(frame))
+            self.mmsg_iov[2 * i + 1].iov_len = len(frame)
+
+        # Socket is connected, so msg_name stays NULL
+        sent = _sendmmsg(self.udp_tx_socket.fileno(), self.mmsg_hdrs, len(batch), 0)
+        if sent < 0:
+            err = ctypes.get_errno()
+            if err not in (errno.EAGAIN, errno.EWOULDBLOCK):  # Send buffer full is a silent drop
+                self.report_tx_error(err, len(batch))
+            return  # Drop this batch, same as the single-send path
+
+        # Kernel accepted only part of the batch - push the rest individually
+        for i in range(sent, len(batch)):
+            self.send_packed_udp(self.tx_header_view[i * self.HEADER_SIZE:(i + 1) * self.HEADER_SIZE], batch[i])
+        for frame in frames[self.max_tx_batch:]:
+            self.send_udp_packet(frame)
+
+    def handle_udp_packet(self, data, addr):
+        """Validate an ESP32 mic packet and queue its audio payload"""
+        # Auto-detect ESP32 IP from first packet
+        if not self.esp32_ip or self.esp32_ip == "192.168.2.xxx":
+            self.esp32_ip = addr[0]
+            self.connect_udp_tx()
+            print(f"🎯 ESP32 detected at {self.esp32_ip}")
 
-                # Debug first 10 packets
-                if packet_count < 10:
-                    print(f"📦 RX packet #{packet_count}: type={packet_type:02x}, len={payload_len}, seq={sequence}")
-                    packet_count += 1
+        # Parse packet
+        if len(data) < self.HEADER_SIZE:
+            self.report_bad_packet(f"Packet too small: {len(data)} bytes")
+            return
 
-                # Validate
-                if packet_type != 0x01:
-                    print(f"⚠️  Wrong packet type: {packet_type:02x}")
-                    continue
+        packet_type, flags, payload_len, ssrc, timestamp, sequence = self.header_struct.unpack_from(data, 0)
 
-                if payload_len != self.FRAME_BYTES_RX:
-                    print(f"⚠️  Wrong payload length: {payload_len} (expected {self.FRAME_BYTES_RX})")
-                    continue
+        # Debug first 10 packets
+        if self.verbose and self.rx_packet_count < 10:
+            print(f"📦 RX packet #{self.rx_packet_count}: type={packet_type:02x}, len={payload_len}, seq={sequence}")
+            self.rx_packet_count += 1
 
-                # Extract audio payload (16-bit mono from ESP32, LEFT channel = AEC-processed)
-                audio_data = data[self.HEADER_SIZE:self.HEADER_SIZE + payload_len]
+        # Validate
+        if packet_type != 0x01:
+            self.report_bad_packet(f"Wrong packet type: {packet_type:02x}")
+            return
 
-                if len(audio_data) == self.FRAME_BYTES_RX:
-                    # Already 16-bit mono, no conversion needed
-                    self.audio_input_buffer.append(audio_data)
+        if payload_len != self.FRAME_BYTES_RX:
+            self.report_bad_packet(f"Wrong payload length: {payload_len} (expected {self.FRAME_BYTES_RX})")
+            return
 
-            except BlockingIOError:
-                await asyncio.sleep(0.001)
-            except Exception as e:
-                print(f"❌ UDP RX error: {e}")
-                import traceback
-                traceback.print_exc()
-                await asyncio.sleep(0.01)
+        # Extract audio payload (16-bit mono from ESP32, LEFT channel = AEC-processed)
+        # memoryview slice: the ring buffer copies the samples out, so skip the intermediate bytes
+        audio_data = memoryview(data)[self.HEADER_SIZE:self.HEADER_SIZE + payload_len]
+
+        if len(audio_data) == self.FRAME_BYTES_RX:
+            # Already 16-bit mono, no conversion needed
+            self.audio_input_buffer.append(audio_data)
+            self.audio_input_event.set()
+
+    def report_playback_drops(self, count):
+        """Tally frames dropped on a full playback buffer; warn at most once per second"""
+        self.playback_dropped += count
+        now = time.monotonic()
+        if now - self.last_drop_report >= 1.0:
+            print(f"⚠️  Dropped {self.playback_dropped} frames (buffer full)")
+            self.playback_dropped = 0
+            self.last_drop_report = now
+
+    def report_tx_error(self, err, count):
+        """Tally frames dropped on UDP send errors; warn at most once per second"""
+        self.tx_errors += count
+        now = time.monotonic()
+        if now - self.last_tx_error_report >= 1.0:
+            print(f"⚠️  ESP32 send failing: {os.strerror(err) if err else 'unknown error'} "
+                  f"({self.tx_errors} frames dropped)")
+            self.tx_errors = 0
+            self.last_tx_error_report = now
+
+    def report_bad_packet(self, reason):
+        """Count rejected RX packets, printing only the first and every 100th"""
+        self.rx_bad_packets += 1
+        if self.rx_bad_packets % 100 == 1:
+            print(f"⚠️  {reason} ({self.rx_bad_packets} bad packets so far)")
+
+    def drain_udp_rx(self):
+        """Read all queued ESP32 datagrams with recvmmsg(), up to max_rx_batch per syscall"""
+        fd = self.udp_rx_socket.fileno()
+        while True:
+            # Kernel overwrites msg_namelen with the actual address size - reset before each call
+            for i in range(self.max_rx_batch):
+                self.rx_hdrs[i].msg_hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+            count = _recvmmsg(fd, self.rx_hdrs, self.max_rx_batch, socket.MSG_DONTWAIT, None)
+            if count < 0:
+                err = ctypes.get_errno()
+                if err not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                    print(f"❌ UDP receive error: {os.strerror(err)}")
+                return
+
+            for i in range(count):
+                start = i * self.rx_slot_size
+                addr = (socket.inet_ntoa(bytes(self.rx_addrs[i].sin_addr)), socket.ntohs(self.rx_addrs[i].sin_port))
+                self.handle_udp_packet(self.rx_view[start:start + self.rx_hdrs[i].msg_len], addr)
+
+            if count < self.max_rx_batch:
+                return
+
+    async def receive_udp_audio(self):
+        """Receive audio from ESP32 via UDP (recvmmsg reader, or datagram endpoint elsewhere)"""
+        # The reader/endpoint outlives OpenAI reconnects - register it once and keep the socket open
+        if RECVMMSG_AVAILABLE:
+            if not self.udp_rx_reader:
+                self.loop.add_reader(self.udp_rx_socket.fileno(), self.drain_udp_rx)
+                self.udp_rx_reader = True
+        elif self.udp_rx_transport is None:
+            self.udp_rx_transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: UdpAudioProtocol(self), sock=self.udp_rx_socket)
+
+        # Packets are handled in reader/protocol callbacks; just park this task
+        await asyncio.Event().wait()
 
     async def receive_speaker_audio(self):
         """Receive audio from local microphone via PyAudio"""
@@ -707,20 +1221,43 @@ EN: "Pardon my rattling bones—could you say that again?"
 
         print("🎤 Listening... (speak naturally)")
 
+        pending_read = None
         try:
             while True:
-                data = await asyncio.to_thread(stream.read, self.SPEAKER_CHUNK, exception_on_overflow=False)
+                # Shielded so cancellation never abandons a worker thread still inside stream.read()
+                pending_read = asyncio.ensure_future(
+                    asyncio.to_thread(stream.read, self.SPEAKER_CHUNK, exception_on_overflow=False))
+                data = await asyncio.shield(pending_read)
                 self.audio_input_buffer.append(data)
-                await asyncio.sleep(0.001)
-        except asyncio.CancelledError:
-            stream.stop_stream()
-            stream.close()
-            raise
+                self.audio_input_event.set()
         except Exception as e:
             print(f"❌ Microphone error: {e}")
+        finally:
+            # Closing a PortAudio stream mid-read is a use-after-close - let the read (<1 chunk) finish first
+            if pending_read is not None and not pending_read.done():
+                await asyncio.wait({pending_read})
             stream.stop_stream()
             stream.close()
 
+    def speaker_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio output callback: pull queued samples, pad underruns with silence"""
+        with self.speaker_ring_lock:
+            samples = self.speaker_ring.read(frame_count)
+            if len(samples) == frame_count:
+                data = samples.tobytes()
+            else:
+                data = samples.tobytes() + bytes(2 * (frame_count - len(samples)))
+            remaining = len(self.speaker_ring)
+
+        # Wake the producer only on the drop below high water it is parked on, not every callback
+        if self.speaker_space_waiting and remaining < self.speaker_high_water:
+            self.speaker_space_waiting = False
+            try:
+                self.loop.call_soon_threadsafe(self.speaker_space_event.set)
+            except RuntimeError:
+                pass  # Event loop already closed (shutdown) - nobody left to wake
+        return (data, self.pa_continue)
+
     async def send_audio_to_speakers(self):
         """Send buffered audio to local speakers with jaw control"""
         import pyaudio
@@ -737,6 +1274,11 @@ EN: "Pardon my rattling bones—could you say that again?"
 
         print("🔊 Starting audio playback")
 
+        # Ring and wakeup state are created once in __init__; drop audio left from a previous session
+        with self.speaker_ring_lock:
+            self.speaker_ring.clear()
+        self.speaker_space_waiting = False
+
         # Initialize output stream
         self.output_stream = self.pyaudio_instance.open(
             format=pyaudio.paInt16,
@@ -744,21 +1286,34 @@ EN: "Pardon my rattling bones—could you say that again?"
             rate=self.SPEAKER_RATE,
             output=True,
             output_device_index=self.audio_output_device,
-            stream_callback=None  # Non-blocking writes
+            frames_per_buffer=self.SPEAKER_CHUNK,
+            stream_callback=self.speaker_callback
         )
 
         frames_sent = 0
         jaw_frame_counter = 0
         smoothed_jaw = 0.0
+        last_jaw_step = 0  # Last published position step; unchanged steps aren't re-sent
         smoothing_factor = 0.6
 
         try:
             while True:
                 if len(self.playback_buffer) > 0:
+                    # Device still has enough queued - wait for the callback to drain it
+                    if len(self.speaker_ring) >= self.speaker_high_water:
+                        # Flag first, then re-check, so a drain racing with the flag can't be missed
+                        self.speaker_space_event.clear()
+                        self.speaker_space_waiting = True
+                        if len(self.speaker_ring) >= self.speaker_high_water:
+                            await self.speaker_space_event.wait()
+                        self.speaker_space_waiting = False
+                        continue
+
                     chunk = self.playback_buffer.popleft()
 
-                    # Write audio to speakers
-                    await asyncio.to_thread(self.output_stream.write, chunk)
+                    # Hand audio to the PortAudio callback (copied into the ring under the lock)
+                    with self.speaker_ring_lock:
+                        self.speaker_ring.append(chunk)
                     frames_sent += 1
 
                     # Move jaw synchronized with playback (if enabled)
@@ -766,25 +1321,28 @@ EN: "Pardon my rattling bones—could you say that again?"
                         jaw_frame_counter += 1
                         if jaw_frame_counter % 3 == 0:  # Every 3rd frame for responsiveness
                             # Calculate jaw position based on audio amplitude
-                            audio_array = np.frombuffer(chunk, dtype=np.int16)
-                            amplitude = np.abs(audio_array).mean()
+                            amplitude = self.frame_amplitude(chunk)
                             target_jaw_open = min(1.0, amplitude / 5000.0)
 
                             # Apply exponential smoothing
                             smoothed_jaw = smoothed_jaw * (1 - smoothing_factor) + target_jaw_open * smoothing_factor
 
-                            # Send smoothed jaw position via MQTT
-                            if self.mqtt_client:
-                                self.mqtt_client.publish(self.jaw_topic, str(smoothed_jaw))
+                            # Send smoothed jaw position via MQTT (only when the quantized step moves)
+                            jaw_step = int(smoothed_jaw * self.JAW_STEPS)
+                            if self.mqtt_client and jaw_step != last_jaw_step:
+                                self.mqtt_client.publish(self.jaw_topic, self.jaw_position_payloads[jaw_step], qos=0)
+                                last_jaw_step = jaw_step
 
-                    if frames_sent % 50 == 0:  # Log every 50 frames
+                    if self.verbose and frames_sent % 50 == 0:  # Log every 50 frames
                         print(f"📤 Sent {frames_sent} frames, buffer: {len(self.playback_buffer)}")
                 else:
                     # Buffer empty - close jaw and wait
                     if self.enable_jaw and self.mqtt_client and smoothed_jaw > 0:
-                        self.mqtt_client.publish(self.jaw_topic, "0.0")
+                        self.mqtt_client.publish(self.jaw_topic, self.jaw_position_payloads[0], qos=0)
                         smoothed_jaw = 0.0
-                    await asyncio.sleep(0.01)
+                        last_jaw_step = 0
+                    self.playback_event.clear()
+                    await self.playback_event.wait()
         except asyncio.CancelledError:
             if self.output_stream:
                 self.output_stream.stop_stream()
@@ -796,10 +1354,90 @@ EN: "Pardon my rattling bones—could you say that again?"
                 self.output_stream.stop_stream()
                 self.output_stream.close()
 
+    def open_camera(self, cv2):
+        """Open the configured webcam/RTSP stream (camera thread only)"""
+        start_connect = time.time()
+
+        # Use appropriate backend based on camera type
+        if self.use_webcam:
+            # Use AVFoundation for webcam on macOS (no FFMPEG warning)
+            import platform
+            if platform.system() == "Darwin":  # macOS
+                camera = cv2.VideoCapture(self.camera_url, cv2.CAP_AVFOUNDATION)
+            else:
+                camera = cv2.VideoCapture(self.camera_url)
+        else:
+            # Use FFMPEG for RTSP streams
+            camera = cv2.VideoCapture(self.camera_url, cv2.CAP_FFMPEG)
+            # Set timeout for RTSP stream
+            camera.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 10000)
+            camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        if not camera.isOpened():
+            camera.release()
+            return None  # camera_grab_loop reports and backs off
+
+        # Webcam warm-up: skip first few frames (they're often black)
+        if self.use_webcam:
+            for _ in range(5):
+                camera.read()  # Discard first frames
+                time.sleep(0.1)
+
+        print(f"📷 Camera opened: {time.time() - start_connect:.2f}s")
+        return camera
+
+    def camera_grab_loop(self):
+        """Keep the camera open and grab continuously so look_at_camera gets a fresh frame instantly"""
+        import cv2
+
+        retry_delay = 5.0
+        while self.camera_running:
+            if self.camera is None:
+                camera = self.open_camera(cv2)
+                if camera is None:
+                    # Camera may be absent or still booting: report once, retry with exponential backoff
+                    if retry_delay == 5.0:
+                        print("❌ Failed to open camera (retrying in the background, up to every 5 min)")
+                    time.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, 300.0)
+                    continue
+                self.camera = camera
+                retry_delay = 5.0
+                last_decode = 0.0
+
+            # grab() blocks until the next frame; it must keep pace with the stream or
+            # RTSP frames queue up and go stale, so only the retrieve() decode is rate-capped
+            ok = self.camera.grab()
+            now = time.time()
+            if ok and now - last_decode >= self.CAMERA_DECODE_INTERVAL:
+                ok, frame = self.camera.retrieve()
+                if ok:
+                    last_decode = now
+                    with self.camera_lock:
+                        self.last_camera_frame = frame
+            if not ok:
+                with self.camera_lock:
+                    self.last_camera_frame = None
+                self.camera.release()
+                self.camera = None
+                print("⚠️  Camera stream lost, reconnecting...")
+                time.sleep(1.0)
+
+    def start_camera(self):
+        """Start the background camera thread (once per run)"""
+        if self.camera_thread is not None or self.camera_url is None:
+            return
+        try:
+            import cv2
+        except ImportError:
+            print("❌ OpenCV not installed. Install with: pip install opencv-python")
+            return
+        self.camera_running = True
+        self.camera_thread = threading.Thread(target=self.camera_grab_loop, name="camera-grab", daemon=True)
+        self.camera_thread.start()
+
     def look_at_camera(self):
         """Capture frame from camera and return base64 image"""
-        import time
-
         # Check if camera is enabled
         if not self.enable_camera:
             print("📸 Camera disabled (use --enable-camera to enable)")
@@ -820,53 +1458,21 @@ EN: "Pardon my rattling bones—could you say that again?"
             print(f"📸 Camera rate limited (last capture {current_time - self.last_camera_capture:.1f}s ago)")
             return None
 
-        if not self.camera_url:
+        if self.camera_url is None:  # Webcam index 0 is a valid source
             print("❌ Camera not configured (set CAMERA_RTSP_STREAM in .env)")
             return None
 
-        print("📷 [1/6] Starting camera capture...")
-
-        # Always reconnect to get fresh frame
-        if self.camera:
-            self.camera.release()
-
-        start_connect = time.time()
-
-        # Use appropriate backend based on camera type
-        if self.use_webcam:
-            # Use AVFoundation for webcam on macOS (no FFMPEG warning)
-            import platform
-            if platform.system() == "Darwin":  # macOS
-                self.camera = cv2.VideoCapture(self.camera_url, cv2.CAP_AVFOUNDATION)
-            else:
-                self.camera = cv2.VideoCapture(self.camera_url)
-        else:
-            # Use FFMPEG for RTSP streams
-            self.camera = cv2.VideoCapture(self.camera_url, cv2.CAP_FFMPEG)
-            # Set timeout for RTSP stream
-            self.camera.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 10000)
-            self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-        if not self.camera.isOpened():
-            print("❌ Failed to open camera")
-            return None
-        connect_time = time.time() - start_connect
-        print(f"📷 [2/7] Camera opened: {connect_time:.2f}s")
-
-        # Webcam warm-up: skip first few frames (they're often black)
-        if self.use_webcam:
-            print(f"📷 [3/7] Warming up webcam...")
-            for _ in range(5):
-                self.camera.read()  # Discard first frames
-                time.sleep(0.1)
+        print("📷 [1/4] Starting camera capture...")
 
+        # Stream is kept open and decoded by camera_grab_loop(); just take its latest frame
         start_read = time.time()
-        ret, frame = self.camera.read()
-        if not ret:
-            print("❌ Failed to capture frame")
+        with self.camera_lock:
+            frame = self.last_camera_frame
+        if frame is None:
+            print("❌ Camera not ready")
             return None
         read_time = time.time() - start_read
-        print(f"📷 [4/7] Frame captured: {read_time:.2f}s")
+        print(f"📷 [2/4] Frame captured: {read_time:.2f}s")
 
         # Get original resolution
         height, width = frame.shape[:2]
@@ -881,23 +1487,23 @@ EN: "Pardon my rattling bones—could you say that again?"
             ratio = max_width / width
             new_width = max_width
             new_height = int(height * ratio)
-            frame_for_api = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
+            frame_for_api = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
         else:
             frame_for_api = frame
         resize_time = time.time() - start_resize
-        print(f"📷 [5/6] Resized: {resize_time:.2f}s")
+        print(f"📷 [3/4] Resized: {resize_time:.2f}s")
 
         # Convert to base64 and optionally save
         start_encode = time.time()
         _, buffer = cv2.imencode('.jpg', frame_for_api, [cv2.IMWRITE_JPEG_QUALITY, 85])
         image_base64 = base64.b64encode(buffer).decode('utf-8')
         encode_time = time.time() - start_encode
-        print(f"📷 [6/6] Encoded to base64: {encode_time:.2f}s")
+        print(f"📷 [4/4] Encoded to base64: {encode_time:.2f}s")
 
         # Save sent image to logs (if enabled)
         if self.save_camera_screenshots:
-            log_path = os.path.join(self.logs_dir, f"camera_{timestamp}.jpg")
-            cv2.imwrite(log_path, frame_for_api, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            log_path = self.logs_dir / f"camera_{timestamp}.jpg"
+            log_path.write_bytes(buffer.tobytes())  # Same JPEG that was sent - no second encode
             print(f"💾 Saved to: {log_path}")
 
         total_time = time.time() - start_total
@@ -913,15 +1519,32 @@ EN: "Pardon my rattling bones—could you say that again?"
             return
 
         try:
-            with open(self.conversation_log_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "session_start": self.conversation_log[0]["timestamp"] if self.conversation_log else None,
-                    "total_messages": len(self.conversation_log),
-                    "messages": self.conversation_log
-                }, f, indent=2, ensure_ascii=False)
+            with self.conversation_log_lock:
+                # Snapshot under the lock: a later write always sees at least as many entries
+                messages = list(self.conversation_log)
+                with open(self.conversation_log_file, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        "session_start": messages[0]["timestamp"] if messages else None,
+                        "total_messages": len(messages),
+                        "messages": messages
+                    }, f, indent=2, ensure_ascii=False)
         except Exception as e:
             print(f"⚠️  Failed to save conversation log: {e}")
 
+    def append_log_entry(self, entry):
+        """Move a queued entry into the conversation log, formatting its epoch timestamp"""
+        entry["timestamp"] = datetime.fromtimestamp(entry["timestamp"]).isoformat()
+        self.conversation_log.append(entry)
+
+    async def conversation_log_writer(self):
+        """Append queued log entries and rewrite the log file once per batch"""
+        while True:
+            self.append_log_entry(await self.conversation_log_queue.get())
+            while not self.conversation_log_queue.empty():
+                self.append_log_entry(self.conversation_log_queue.get_nowait())
+            # Serializing and rewriting the whole log grows with the conversation - keep it off the loop
+            await asyncio.to_thread(self._save_conversation_log)
+
     def set_audio_effects(self, effects, intensity="medium", pitch_direction="down"):
         """Enable or disable audio effects dynamically with adjustable intensity and pitch direction"""
         if not PEDALBOARD_AVAILABLE:
@@ -947,9 +1570,9 @@ EN: "Pardon my rattling bones—could you say that again?"
         if 'pitch' in effects:
             # Calculate semitones based on direction and intensity
             if pitch_direction == "up":
-                semitones = int(1 * multiplier + 1)  # light=+2, medium=+2, heavy=+3
+                semitones = int(1 * multiplier + 1)  # light=+1, medium=+2, heavy=+2
             else:  # down
-                semitones = int(-1 * multiplier - 1)  # light=-2, medium=-2, heavy=-3
+                semitones = int(-1 * multiplier - 1)  # light=-1, medium=-2, heavy=-2
             new_effects.append(PitchShift(semitones=semitones))
             direction_label = "↑" if pitch_direction == "up" else "↓"
             print(f"🎛️  Enabled PitchShift effect ({direction_label}{abs(semitones)} semitones, {intensity})")
@@ -964,21 +1587,60 @@ EN: "Pardon my rattling bones—could you say that again?"
         # Update pedalboard
         if new_effects:
             self.pedalboard = Pedalboard(new_effects)
+            self.audio_effects_active = True
             pitch_info = f" [{pitch_direction}]" if 'pitch' in effects else ""
             print(f"✅ Audio effects updated: {', '.join(effects)} [{intensity}]{pitch_info}")
             return {"status": "enabled", "effects": effects, "intensity": intensity, "pitch_direction": pitch_direction}
         else:
             self.pedalboard = None
+            self.audio_effects_active = False
             print("🔇 Audio effects disabled")
             return {"status": "disabled"}
 
+    def apply_audio_effects(self, audio_int16, sample_rate):
+        """Run int16 audio through the Pedalboard chain using reusable float32/int16 scratch buffers"""
+        n = len(audio_int16)
+        if n > len(self.fx_scratch_f32):
+            self.fx_scratch_f32 = np.empty(n, dtype=np.float32)
+            self.fx_scratch_i16 = np.empty(n, dtype=np.int16)
+
+        audio_float = self.fx_scratch_f32[:n]
+        np.multiply(audio_int16, np.float32(1.0 / 32768.0), out=audio_float)
+
+        processed = self.pedalboard(audio_float[np.newaxis, :], sample_rate).reshape(-1)
+
+        # Scale, round and clip in place so the int16 store is the only other pass
+        np.multiply(processed, np.float32(32768.0), out=processed)
+        np.rint(processed, out=processed)
+        np.clip(processed, -32768, 32767, out=processed)
+        audio_out = self.fx_scratch_i16[:len(processed)]
+        audio_out[...] = processed
+        return audio_out
+
+    def frame_amplitude(self, chunk):
+        """Mean absolute sample value of one playback frame, without temporary arrays"""
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        if len(samples) == 0:
+            return 0.0
+        magnitude = self.jaw_scratch[:len(samples)]
+        np.abs(samples, out=magnitude, dtype=np.int32)
+        return int(magnitude.sum()) / len(samples)
+
+    def init_music_mixer(self):
+        """Start the pygame mixer on demand so no SDL audio thread runs until music is used"""
+        if not self.mixer_initialized:
+            pygame.mixer.init()
+            pygame.mixer.music.set_volume(self.music_volume_normal)
+            self.mixer_initialized = True
+
     def play_scary_music(self, filename):
-        """Play background music"""
+        """Play background music (blocking - call via asyncio.to_thread)"""
         if filename not in self.available_sounds:
             return {"error": f"File {filename} not found"}
 
-        filepath = os.path.join(self.sounds_dir, filename)
+        filepath = str(self.sounds_dir / filename)
         try:
+            self.init_music_mixer()
             pygame.mixer.music.load(filepath)
             pygame.mixer.music.play(-1)  # Loop
             self.music_playing = True
@@ -987,9 +1649,23 @@ EN: "Pardon my rattling bones—could you say that again?"
         except Exception as e:
             return {"error": str(e)}
 
+    def set_music_volume(self, volume):
+        """Request a music volume change without taking SDL's mixer lock on the event loop"""
+        self.music_volume_target = volume
+        if self.music_volume_task is None or self.music_volume_task.done():
+            self.music_volume_task = asyncio.create_task(self.apply_music_volume())
+
+    async def apply_music_volume(self):
+        """Apply the latest requested volume in a worker thread; requests made meanwhile collapse into one"""
+        applied = None
+        while applied != self.music_volume_target:
+            applied = self.music_volume_target
+            await asyncio.to_thread(pygame.mixer.music.set_volume, applied)
+
     def stop_music(self):
         """Stop background music"""
-        pygame.mixer.music.stop()
+        if self.mixer_initialized:
+            pygame.mixer.music.stop()
         self.music_playing = False
         print("🔇 Music stopped")
         return {"status": "stopped"}
@@ -1049,13 +1725,12 @@ EN: "Pardon my rattling bones—could you say that again?"
                 return {"status": "off", "device": self.aurora_device_name}
             elif action == "blink":
                 print(f"⚡ UV light blinking for {duration}s (interval: {interval}s)")
-                start_time = asyncio.get_event_loop().time()
+                start_time = self.loop.time()
                 blink_count = 0
-                while (asyncio.get_event_loop().time() - start_time) < duration:
-                    await device.async_turn_on()
-                    await asyncio.sleep(interval)
-                    await device.async_turn_off()
-                    await asyncio.sleep(interval)
+                # Each toggle's round trip overlaps its interval instead of adding to it
+                while (self.loop.time() - start_time) < duration:
+                    await asyncio.gather(device.async_turn_on(), asyncio.sleep(interval))
+                    await asyncio.gather(device.async_turn_off(), asyncio.sleep(interval))
                     blink_count += 1
                 # Leave on after blinking
                 await device.async_turn_on()
@@ -1068,6 +1743,15 @@ EN: "Pardon my rattling bones—could you say that again?"
             print(f"❌ Failed to control UV light: {e}")
             return {"error": str(e)}
 
+    async def set_flood_light_color(self, rgb):
+        """Switch the flood light to one RGB color (None = off) without blocking the event loop"""
+        if rgb is None:
+            await asyncio.to_thread(self.flood_light.turn_off)
+        else:
+            await asyncio.to_thread(self.flood_light.turn_on)
+            await asyncio.sleep(0.1)
+            await asyncio.to_thread(self.flood_light.set_colour, *rgb)
+
     async def control_flood_light(self, action, color=None, sequence=None, duration=None, interval=None, brightness=100):
         """Control Smart Flood Light with colors and sequences"""
         if not self.flood_light:
@@ -1090,27 +1774,24 @@ EN: "Pardon my rattling bones—could you say that again?"
         try:
             # Set brightness
             if brightness != 100:
-                self.flood_light.set_brightness_percentage(brightness)
+                await asyncio.to_thread(self.flood_light.set_brightness_percentage, brightness)
                 await asyncio.sleep(0.1)
 
             if action == "on":
-                self.flood_light.turn_on()
+                await asyncio.to_thread(self.flood_light.turn_on)
                 print(f"💡 Flood light turned ON")
                 return {"status": "on"}
 
             elif action == "off":
-                self.flood_light.turn_off()
+                await asyncio.to_thread(self.flood_light.turn_off)
                 print(f"💡 Flood light turned OFF")
                 return {"status": "off"}
 
             elif action == "color":
                 if not color or color not in colors:
                     return {"error": f"Invalid color: {color}"}
-                self.flood_light.turn_on()
-                await asyncio.sleep(0.1)
-                r, g, b = colors[color]
-                self.flood_light.set_colour(r, g, b)
-                print(f"💡 Flood light set to {color.upper()} ({r},{g},{b})")
+                await self.set_flood_light_color(colors[color])
+                print(f"💡 Flood light set to {color.upper()}" + (f" {colors[color]}" if colors[color] else ""))
                 return {"status": "color", "color": color}
 
             elif action == "sequence":
@@ -1124,14 +1805,9 @@ EN: "Pardon my rattling bones—could you say that again?"
                 for color_name in sequence:
                     if color_name not in colors:
                         continue
-                    if color_name == "off":
-                        self.flood_light.turn_off()
-                    else:
-                        self.flood_light.turn_on()
-                        await asyncio.sleep(0.1)
-                        r, g, b = colors[color_name]
-                        self.flood_light.set_colour(r, g, b)
-                    await asyncio.sleep(seq_interval)
+                    # tinytuya calls block on the device round trip - run them in a thread, timed
+                    # against the step interval so the latency doesn't stretch the sequence
+                    await asyncio.gather(self.set_flood_light_color(colors[color_name]), asyncio.sleep(seq_interval))
 
                 print(f"✅ Sequence completed ({len(sequence)} colors)")
                 return {"status": "sequence", "count": len(sequence)}
@@ -1141,17 +1817,15 @@ EN: "Pardon my rattling bones—could you say that again?"
                 blink_interval = interval if interval is not None else 0.5
 
                 print(f"⚡ Flood light blinking for {blink_duration}s (interval: {blink_interval}s)")
-                start_time = asyncio.get_event_loop().time()
+                start_time = self.loop.time()
                 blink_count = 0
-                while (asyncio.get_event_loop().time() - start_time) < blink_duration:
-                    self.flood_light.turn_on()
-                    await asyncio.sleep(blink_interval)
-                    self.flood_light.turn_off()
-                    await asyncio.sleep(blink_interval)
+                while (self.loop.time() - start_time) < blink_duration:
+                    await asyncio.gather(asyncio.to_thread(self.flood_light.turn_on), asyncio.sleep(blink_interval))
+                    await asyncio.gather(asyncio.to_thread(self.flood_light.turn_off), asyncio.sleep(blink_interval))
                     blink_count += 1
 
                 # Leave on after blinking
-                self.flood_light.turn_on()
+                await asyncio.to_thread(self.flood_light.turn_on)
                 print(f"💡 Flood light blinked {blink_count} times, now ON")
                 return {"status": "blinked", "count": blink_count}
 
@@ -1169,7 +1843,7 @@ EN: "Pardon my rattling bones—could you say that again?"
         if function_name == "look_at_camera":
             return self.look_at_camera()
         elif function_name == "play_scary_music":
-            return self.play_scary_music(arguments.get("filename"))
+            return await asyncio.to_thread(self.play_scary_music, arguments.get("filename"))
         elif function_name == "stop_music":
             return self.stop_music()
         elif function_name == "control_uv_light":
@@ -1190,35 +1864,94 @@ EN: "Pardon my rattling bones—could you say that again?"
 
         return {"error": "Unknown function"}
 
+    async def tool_look_at_camera(self, call_id, arguments):
+        """look_at_camera tool: reply, then attach the captured frame as a user image message"""
+        print("📷 Looking at camera...")
+
+        # Capture frame - resize and JPEG encode run off the event loop
+        image_b64 = await asyncio.to_thread(self.look_at_camera)
+
+        if image_b64:
+            print("👁️  Captured image, sending to model...")
+
+            # Complete the function call, then add the image as a user message
+            await self.send_function_result(call_id, "Camera image captured successfully", {
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "input_image",
+                            "image_url": f"data:image/jpeg;base64,{image_b64}"
+                        }
+                    ]
+                }
+            })
+        else:
+            print("❌ Failed to capture frame")
+            await self.send_function_result(call_id, "ERROR: Failed to capture camera frame")
+
+    async def tool_set_audio_effects(self, call_id, arguments):
+        effects = arguments.get("effects", [])
+        intensity = arguments.get("intensity", "medium")
+        pitch_direction = arguments.get("pitch_direction", "down")
+        print(f"🎚️  set_audio_effects called: effects={effects}, intensity={intensity}, pitch_direction={pitch_direction}")
+        result = self.set_audio_effects(effects, intensity, pitch_direction)
+        await self.send_function_result(call_id, json.dumps(result))
+
+    async def tool_play_scary_music(self, call_id, arguments):
+        # First play opens the SDL audio device, and load() reads the file - keep both off the loop
+        result = await asyncio.to_thread(self.play_scary_music, arguments.get("filename"))
+        await self.send_function_result(call_id, json.dumps(result))
+
+    async def tool_stop_music(self, call_id, arguments):
+        result = self.stop_music()
+        await self.send_function_result(call_id, json.dumps(result))
+
+    async def send_function_result(self, call_id, output, *extra_events):
+        """Reply to a tool call: function_call_output, any extra events, then response.create.
+
+        The Realtime API takes one event per websocket message, so the events are
+        serialized up front and written back-to-back with no other work in between.
+        """
+        messages = [FUNCTION_OUTPUT_PREFIX + json.dumps(call_id) + FUNCTION_OUTPUT_MIDDLE + json.dumps(output) + FUNCTION_OUTPUT_SUFFIX]
+        messages.extend(json.dumps(event) for event in extra_events)
+        messages.append(RESPONSE_CREATE_JSON)
+        for message in messages:
+            await self.websocket.send(message)
+
     async def send_audio_to_openai(self):
         """Send audio from input (ESP32 or microphone) to OpenAI"""
         source = "Microphone" if self.output_mode == "speakers" else "ESP32"
         print(f"🎤 Starting audio send task ({source} → OpenAI)")
 
         while True:
-            if self.audio_input_buffer and self.websocket:
-                # Get audio chunk
-                audio_chunk = self.audio_input_buffer.popleft()
-
-                # Convert to int16 array
-                audio_mono = np.frombuffer(audio_chunk, dtype=np.int16)
-
-                # Resample if needed (ESP32 is 16kHz, speakers are already 24kHz)
-                if self.output_mode == "esp32_udp":
-                    # Resample from 16kHz to 24kHz for OpenAI
-                    resampled = signal.resample(audio_mono, int(len(audio_mono) * self.OPENAI_RATE / self.ESP32_RATE))
-                    audio_to_send = np.clip(resampled, -32768, 32767).astype(np.int16)
-                else:  # speakers mode - already 24kHz
-                    audio_to_send = audio_mono
-
-                # Send to OpenAI
-                audio_base64 = base64.b64encode(audio_to_send.tobytes()).decode('utf-8')
-                await self.websocket.send(json.dumps({
-                    "type": "input_audio_buffer.append",
-                    "audio": audio_base64
-                }))
-            else:
-                await asyncio.sleep(0.001)
+            if not self.audio_input_buffer or not self.websocket:
+                # Sleep until a producer queues more input
+                self.audio_input_event.clear()
+                await self.audio_input_event.wait()
+                continue
+
+            # Drain buffered samples so bursts go out as one websocket frame
+            audio_mono = self.audio_input_buffer.read(self.max_input_batch)
+
+            # Resample if needed (ESP32 is 16kHz, speakers are already 24kHz)
+            if self.output_mode == "esp32_udp":
+                # Resample from 16kHz to 24kHz for OpenAI
+                resampled = self.uplink_resampler.process(audio_mono)
+                np.rint(resampled, out=resampled)
+                np.clip(resampled, -32768, 32767, out=resampled)
+                if len(resampled) > len(self.uplink_i16):
+                    self.uplink_i16 = np.empty(len(resampled), dtype=np.int16)
+                audio_to_send = self.uplink_i16[:len(resampled)]
+                audio_to_send[...] = resampled
+            else:  # speakers mode - already 24kHz
+                audio_to_send = audio_mono
+
+            # Send to OpenAI - base64 never needs JSON escaping, so splice it into a fixed envelope
+            audio_base64 = binascii.b2a_base64(audio_to_send, newline=False).decode('ascii')
+            await self.websocket.send(AUDIO_APPEND_PREFIX + audio_base64 + AUDIO_APPEND_SUFFIX)
 
     async def send_audio_to_esp32(self):
         """Send buffered audio to ESP32 with precise timing"""
@@ -1227,15 +1960,17 @@ EN: "Pardon my rattling bones—could you say that again?"
         frames_sent = 0
         last_send_time = None
         jaw_frame_counter = 0
+        loop_time = self.loop.time  # Bound once; called up to twice per frame
+        playback_buffer = self.playback_buffer
 
         while True:
-            if len(self.playback_buffer) > 0:
-                current_time = asyncio.get_event_loop().time()
+            if playback_buffer:
+                current_time = loop_time()
 
                 # Reset timing if buffer was empty (first frame or after gap)
                 if last_send_time is None:
                     last_send_time = current_time
-                    print(f"🎬 Starting playback stream, buffer: {len(self.playback_buffer)}")
+                    print(f"🎬 Starting playback stream, buffer: {len(playback_buffer)}")
 
                 # Calculate timing
                 expected_time = last_send_time + 0.040  # 40ms per frame
@@ -1244,254 +1979,175 @@ EN: "Pardon my rattling bones—could you say that again?"
                 if time_until_next > 0:
                     await asyncio.sleep(time_until_next)
 
-                # Send frame
-                chunk = self.playback_buffer.popleft()
-                self.send_udp_packet(chunk)
-                frames_sent += 1
+                # Send frame - if the loop fell behind, flush every overdue frame in one batch
+                chunks = [playback_buffer.popleft()]
                 last_send_time = expected_time
+                now = loop_time()
+                while (playback_buffer and len(chunks) < self.max_tx_batch
+                       and last_send_time + 0.040 <= now):
+                    chunks.append(playback_buffer.popleft())
+                    last_send_time += 0.040
+                self.send_udp_packets(chunks)
+                prev_frames_sent = frames_sent
+                frames_sent += len(chunks)
+                chunk = chunks[-1]
 
                 # Move jaw synchronized with actual playback (if enabled)
                 if self.enable_jaw:
-                    jaw_frame_counter += 1
-                    if jaw_frame_counter % 6 == 0:  # Every 6th frame (240ms intervals) - reduced frequency
+                    # Counters advance by the whole batch, so test for crossing a boundary, not % == 0
+                    prev_jaw_frames = jaw_frame_counter
+                    jaw_frame_counter += len(chunks)
+                    if prev_jaw_frames // 6 != jaw_frame_counter // 6:  # Every 6th frame (240ms intervals) - reduced frequency
                         # Analyze audio amplitude from the chunk being played
-                        audio_int16 = np.frombuffer(chunk, dtype=np.int16)
-                        amplitude = np.abs(audio_int16).mean()
+                        amplitude = self.frame_amplitude(chunk)
 
                         # Map amplitude to jaw pulse duration (20-150ms range)
                         if amplitude > 500:  # Only move jaw if there's significant audio
-                            pulse_duration = int(np.clip(20 + (amplitude / 8000.0) * 130, 20, 150))
-                            self.mqtt_client.publish(self.jaw_topic, str(pulse_duration))
-                            if jaw_frame_counter % 24 == 0:  # Log occasionally
+                            pulse_duration = min(150, int(20 + (amplitude / 8000.0) * 130))  # amplitude > 500 keeps it >= 20
+                            self.mqtt_client.publish(self.jaw_topic, self.jaw_pulse_payloads[pulse_duration], qos=0)
+                            if self.verbose and prev_jaw_frames // 24 != jaw_frame_counter // 24:  # Log occasionally
                                 print(f"💀 Jaw pulse: {pulse_duration}ms (amp: {amplitude:.0f})")
 
-                if frames_sent % 25 == 0:  # Every 25 frames = 1 second
-                    print(f"📤 Sent {frames_sent} frames, buffer: {len(self.playback_buffer)}")
+                if self.verbose and prev_frames_sent // 25 != frames_sent // 25:  # Every 25 frames = 1 second
+                    print(f"📤 Sent {frames_sent} frames, buffer: {len(playback_buffer)}")
             else:
                 # Buffer empty - reset timing for next stream
                 if last_send_time is not None:
                     print(f"⏸️  Buffer empty, waiting for audio...")
                     last_send_time = None
                     jaw_frame_counter = 0
-                await asyncio.sleep(0.005)  # Wait for buffer to fill
+                # Wait for the receive task to queue audio
+                self.playback_event.clear()
+                await self.playback_event.wait()
+
+    async def on_function_call(self, msg):
+        """response.function_call_arguments.done: run the matching tool handler"""
+        call_id = msg.get("call_id")
+        function_name = msg.get("name")
+        arguments_str = msg.get("arguments", "{}")
+        arguments = json_loads(arguments_str)
+
+        handler = self.tool_handlers.get(function_name)
+        if handler:
+            await handler(call_id, arguments)
+
+    async def on_speech_started(self, msg):
+        print("👂 Speech detected")
+        # Duck music
+        if self.music_playing:
+            self.set_music_volume(self.music_volume_ducked)
+
+    async def on_speech_stopped(self, msg):
+        print("🤫 Speech stopped")
+        # Restore music volume
+        if self.music_playing:
+            self.set_music_volume(self.music_volume_normal)
+
+    async def on_user_transcript(self, msg):
+        self.log_transcript("User", msg.get("transcript", ""))
+
+    async def on_franky_transcript(self, msg):
+        self.log_transcript("Franky", msg.get("transcript", ""))
+
+    async def on_openai_error(self, msg):
+        print(f"❌ Error from OpenAI: {msg}")
+
+    def log_transcript(self, speaker, transcript):
+        """Queue a transcript line for the conversation log writer"""
+        if transcript and self.log_conversation:
+            log_entry = {
+                "timestamp": time.time(),  # Formatted to ISO by the log writer, off the receive loop
+                "speaker": speaker,
+                "text": transcript
+            }
+            self.conversation_log_queue.put_nowait(log_entry)
+            print(f"📝 Logged {speaker}: {transcript[:50]}...")
 
     async def receive_from_openai(self):
         """Receive messages from OpenAI and handle audio/events"""
         print("📥 Starting OpenAI receive task")
 
-        accumulated_audio = bytearray()
-        audio_chunks_received = 0
+        # Fixed holding slot for the trailing partial ESP32 frame between deltas
+        pending_frame = bytearray(self.FRAME_BYTES_TX)
+        pending_len = 0
 
         async for message in self.websocket:
             try:
-                msg = json.loads(message)
+                msg = json_loads(message)
                 msg_type = msg.get("type")
 
-                # Audio from OpenAI
+                # Audio from OpenAI - by far the most frequent event, handled inline
                 if msg_type == "response.audio.delta":
-                    audio_base64 = msg.get("delta", "")
-                    audio_bytes = base64.b64decode(audio_base64)
-                    audio_chunks_received += 1
-
-                    audio_int16 = np.frombuffer(audio_bytes, dtype=np.int16)
+                    # Decode straight to bytes and view them as int16 (no extra copy)
+                    audio_int16 = np.frombuffer(binascii.a2b_base64(msg.get("delta", "")), dtype=np.int16)
 
                     # Resample and apply effects based on output mode
                     if self.output_mode == "esp32_udp":
                         # Convert from 24kHz to 16kHz for ESP32
-                        resampled = signal.resample(audio_int16, int(len(audio_int16) * self.ESP32_RATE / self.OPENAI_RATE))
-                        audio_processed = np.clip(resampled, -32768, 32767).astype(np.int16)
+                        resampled = self.downlink_resampler.process(audio_int16)
+                        np.rint(resampled, out=resampled)
+                        np.clip(resampled, -32768, 32767, out=resampled)
+                        if len(resampled) > len(self.downlink_i16):
+                            self.downlink_i16 = np.empty(len(resampled), dtype=np.int16)
+                        audio_processed = self.downlink_i16[:len(resampled)]
+                        audio_processed[...] = resampled
 
                         # Apply audio effects if enabled
-                        if self.pedalboard and len(audio_processed) > 0:
-                            audio_float = audio_processed.astype(np.float32) / 32768.0
-                            audio_float = audio_float.reshape(1, -1)
-                            processed = self.pedalboard(audio_float, self.ESP32_RATE)
-                            audio_processed = np.clip(processed.flatten() * 32768.0, -32768, 32767).astype(np.int16)
-
-                        accumulated_audio.extend(audio_processed.tobytes())
+                        if self.audio_effects_active and len(audio_processed) > 0:
+                            audio_processed = self.apply_audio_effects(audio_processed, self.ESP32_RATE)
 
-                        # Accumulate into ESP32 frame size (40ms chunks)
+                        # Cut into ESP32 frames (40ms chunks): top up the pending partial frame,
+                        # queue whole frames straight from the samples, keep the remainder
+                        data = memoryview(audio_processed).cast('B')
                         chunks_dropped = 0
-                        while len(accumulated_audio) >= self.FRAME_BYTES_TX:
-                            chunk = bytes(accumulated_audio[:self.FRAME_BYTES_TX])
-
-                            if len(self.playback_buffer) < self.max_buffer_size:
-                                self.playback_buffer.append(chunk)
-                            else:
+                        offset = 0
+                        if pending_len:
+                            offset = min(self.FRAME_BYTES_TX - pending_len, len(data))
+                            pending_frame[pending_len:pending_len + offset] = data[:offset]
+                            pending_len += offset
+                            if pending_len == self.FRAME_BYTES_TX:
+                                if not self.playback_buffer.append(pending_frame):
+                                    chunks_dropped += 1
+                                pending_len = 0
+                        while len(data) - offset >= self.FRAME_BYTES_TX:
+                            if not self.playback_buffer.append(data[offset:offset + self.FRAME_BYTES_TX]):
                                 chunks_dropped += 1
-
-                            accumulated_audio = accumulated_audio[self.FRAME_BYTES_TX:]
+                            offset += self.FRAME_BYTES_TX
+                        if offset < len(data):
+                            pending_len = len(data) - offset
+                            pending_frame[:pending_len] = data[offset:]
 
                         if chunks_dropped > 0:
-                            print(f"⚠️  Dropped {chunks_dropped} frames (buffer full)")
+                            self.report_playback_drops(chunks_dropped)
+
+                        if self.playback_buffer:
+                            self.playback_event.set()
 
                     else:  # speakers mode - no resampling needed, already 24kHz
                         audio_processed = audio_int16
 
                         # Apply audio effects if enabled
-                        if self.pedalboard and len(audio_processed) > 0:
-                            audio_float = audio_processed.astype(np.float32) / 32768.0
-                            audio_float = audio_float.reshape(1, -1)
-                            processed = self.pedalboard(audio_float, self.SPEAKER_RATE)
-                            audio_processed = np.clip(processed.flatten() * 32768.0, -32768, 32767).astype(np.int16)
+                        if self.audio_effects_active and len(audio_processed) > 0:
+                            audio_processed = self.apply_audio_effects(audio_processed, self.SPEAKER_RATE)
 
                         # Add directly to playback buffer (no frame segmentation needed)
-                        if len(self.playback_buffer) < self.max_buffer_size:
-                            self.playback_buffer.append(audio_processed.tobytes())
-                        else:
-                            print(f"⚠️  Dropped chunk (buffer full)")
-
-                # Response done
-                elif msg_type == "response.audio.done":
-                    # Reset for next response
-                    audio_chunks_received = 0
-                    # Close jaw
-                    # self.mqtt_client.publish(self.jaw_topic, "0.0")
-
-                # Function call
-                elif msg_type == "response.function_call_arguments.done":
-                    call_id = msg.get("call_id")
-                    function_name = msg.get("name")
-                    arguments_str = msg.get("arguments", "{}")
-                    arguments = json.loads(arguments_str)
-
-                    if function_name == "look_at_camera":
-                        print("📷 Looking at camera...")
-
-                        # Capture frame
-                        image_b64 = self.look_at_camera()
-
-                        if image_b64:
-                            print("👁️  Captured image, sending to model...")
-
-                            # Complete the function call first
-                            await self.websocket.send(json.dumps({
-                                "type": "conversation.item.create",
-                                "item": {
-                                    "type": "function_call_output",
-                                    "call_id": call_id,
-                                    "output": "Camera image captured successfully"
-                                }
-                            }))
-
-                            # Add image as a user message in conversation
-                            await self.websocket.send(json.dumps({
-                                "type": "conversation.item.create",
-                                "item": {
-                                    "type": "message",
-                                    "role": "user",
-                                    "content": [
-                                        {
-                                            "type": "input_image",
-                                            "image_url": f"data:image/jpeg;base64,{image_b64}"
-                                        }
-                                    ]
-                                }
-                            }))
-
-                            # Trigger response
-                            await self.websocket.send(json.dumps({"type": "response.create"}))
-                        else:
-                            print("❌ Failed to capture frame")
-                            await self.websocket.send(json.dumps({
-                                "type": "conversation.item.create",
-                                "item": {
-                                    "type": "function_call_output",
-                                    "call_id": call_id,
-                                    "output": "ERROR: Failed to capture camera frame"
-                                }
-                            }))
-
-                            # Trigger response
-                            await self.websocket.send(json.dumps({"type": "response.create"}))
-
-                    elif function_name == "set_audio_effects":
-                        effects = arguments.get("effects", [])
-                        intensity = arguments.get("intensity", "medium")
-                        pitch_direction = arguments.get("pitch_direction", "down")
-                        print(f"🎚️  set_audio_effects called: effects={effects}, intensity={intensity}, pitch_direction={pitch_direction}")
-                        result = self.set_audio_effects(effects, intensity, pitch_direction)
-                        await self.websocket.send(json.dumps({
-                            "type": "conversation.item.create",
-                            "item": {
-                                "type": "function_call_output",
-                                "call_id": call_id,
-                                "output": json.dumps(result)
-                            }
-                        }))
-                        await self.websocket.send(json.dumps({"type": "response.create"}))
-
-                    elif function_name == "play_scary_music":
-                        result = self.play_scary_music(arguments.get("filename"))
-                        await self.websocket.send(json.dumps({
-                            "type": "conversation.item.create",
-                            "item": {
-                                "type": "function_call_output",
-                                "call_id": call_id,
-                                "output": json.dumps(result)
-                            }
-                        }))
-                        await self.websocket.send(json.dumps({"type": "response.create"}))
-
-                    elif function_name == "stop_music":
-                        result = self.stop_music()
-                        await self.websocket.send(json.dumps({
-                            "type": "conversation.item.create",
-                            "item": {
-                                "type": "function_call_output",
-                                "call_id": call_id,
-                                "output": json.dumps(result)
-                            }
-                        }))
-                        await self.websocket.send(json.dumps({"type": "response.create"}))
-
-                # Speech detected
-                elif msg_type == "input_audio_buffer.speech_started":
-                    print("👂 Speech detected")
-                    # Duck music
-                    if self.music_playing:
-                        pygame.mixer.music.set_volume(self.music_volume_ducked)
-
-                elif msg_type == "input_audio_buffer.speech_stopped":
-                    print("🤫 Speech stopped")
-                    # Restore music volume
-                    if self.music_playing:
-                        pygame.mixer.music.set_volume(self.music_volume_normal)
-
-                # Transcription events (for logging)
-                elif msg_type == "conversation.item.input_audio_transcription.completed":
-                    transcript = msg.get("transcript", "")
-                    if transcript and self.log_conversation:
-                        log_entry = {
-                            "timestamp": datetime.now().isoformat(),
-                            "speaker": "User",
-                            "text": transcript
-                        }
-                        self.conversation_log.append(log_entry)
-                        self._save_conversation_log()
-                        print(f"📝 Logged user: {transcript[:50]}...")
-
-                elif msg_type == "response.audio_transcript.done":
-                    transcript = msg.get("transcript", "")
-                    if transcript and self.log_conversation:
-                        log_entry = {
-                            "timestamp": datetime.now().isoformat(),
-                            "speaker": "Franky",
-                            "text": transcript
-                        }
-                        self.conversation_log.append(log_entry)
-                        self._save_conversation_log()
-                        print(f"📝 Logged Franky: {transcript[:50]}...")
+                        if not self.playback_buffer.append(audio_processed):  # All-or-nothing per delta
+                            self.report_playback_drops(-(-audio_processed.nbytes // self.playback_buffer.slot_size))
+                        self.playback_event.set()
 
-                # Errors
-                elif msg_type == "error":
-                    print(f"❌ Error from OpenAI: {msg}")
+                # Every other event: one dict lookup instead of walking an elif chain
+                else:
+                    handler = self.event_handlers.get(msg_type)
+                    if handler:
+                        await handler(msg)
 
             except Exception as e:
                 print(f"Error processing message: {e}")
 
     async def run(self):
         """Main run loop with auto-reconnect"""
+        self.loop = asyncio.get_running_loop()
+
         print("=" * 60)
         mode_title = "Speaker Mode" if self.output_mode == "speakers" else "ESP32 UDP Edition"
         print(f"🎃 Franky Voice Bot - {mode_title}")
@@ -1513,6 +2169,14 @@ EN: "Pardon my rattling bones—could you say that again?"
         print(f"Music files: {len(self.available_sounds)}")
         print("=" * 60)
 
+        # Camera stays open for the whole run; frames are grabbed in a background thread
+        if self.enable_camera and self.camera_url is not None:
+            self.start_camera()
+
+        # Conversation log writer lives for the whole run, across reconnects
+        if self.log_conversation:
+            self.conversation_log_task = asyncio.create_task(self.conversation_log_writer())
+
         # Connect to MQTT (control only) if enabled
         if self.enable_mqtt:
             try:
@@ -1530,6 +2194,7 @@ EN: "Pardon my rattling bones—could you say that again?"
         # Auto-reconnect loop with exponential backoff
         reconnect_attempts = 0
         max_reconnect_delay = 60  # Max 60 seconds between retries
+        tasks = []
 
         while True:
             try:
@@ -1551,27 +2216,8 @@ EN: "Pardon my rattling bones—could you say that again?"
                     print("✅ Connected to OpenAI Realtime API")
                     reconnect_attempts = 0  # Reset counter on successful connection
 
-                    # Configure session
-                    await ws.send(json.dumps({
-                        "type": "session.update",
-                        "session": {
-                            "modalities": ["text", "audio"],
-                            "instructions": self.system_prompt,
-                            "voice": self.voice,
-                            "input_audio_format": "pcm16",
-                            "output_audio_format": "pcm16",
-                            "input_audio_transcription": {"model": "whisper-1"},
-                            "turn_detection": {
-                                "type": "server_vad",
-                                "threshold": 0.5,
-                                "prefix_padding_ms": 300,
-                                "silence_duration_ms": 500
-                            },
-                            "tools": self.tools,
-                            "tool_choice": "auto",
-                            "temperature": 0.8,
-                        }
-                    }))
+                    # Configure session (payload serialized once in __init__)
+                    await ws.send(self.session_update_json)
 
                     # Start tasks based on output mode
                     if self.output_mode == "esp32_udp":
@@ -1589,7 +2235,25 @@ EN: "Pardon my rattling bones—could you say that again?"
                             asyncio.create_task(self.receive_from_openai())
                         ]
 
-                    await asyncio.gather(*tasks, return_exceptions=True)
+                    # The session ends when receive_from_openai does (dropped socket); the audio tasks
+                    # ending on their own is logged but doesn't force a reconnect. Then cancel and
+                    # reap the rest so no task from this connection outlives it
+                    ws_task = tasks[-1]
+                    pending = set(tasks)
+                    try:
+                        while ws_task in pending:
+                            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                            for task in done:
+                                if task is not ws_task and not task.cancelled() and task.exception():
+                                    print(f"⚠️  Audio task stopped: {task.exception()!r}")
+                    finally:
+                        for task in tasks:
+                            task.cancel()
+                        await asyncio.gather(*tasks, return_exceptions=True)
+
+                    if not ws_task.cancelled() and ws_task.exception():
+                        raise ws_task.exception()
+                    raise ConnectionError("OpenAI session ended")
 
             except KeyboardInterrupt:
                 print("\n👋 Shutting down gracefully...")
@@ -1624,8 +2288,27 @@ EN: "Pardon my rattling bones—could you say that again?"
             except:
                 pass
 
-        # Release camera
-        if self.camera:
+        # Flush any conversation log entries still queued
+        if self.log_conversation:
+            if self.conversation_log_task:
+                self.conversation_log_task.cancel()
+            while not self.conversation_log_queue.empty():
+                self.append_log_entry(self.conversation_log_queue.get_nowait())
+            self._save_conversation_log()
+
+        # Close UDP endpoint
+        if self.output_mode == "esp32_udp":
+            if self.udp_rx_reader:
+                self.loop.remove_reader(self.udp_rx_socket.fileno())
+                self.udp_rx_reader = False
+            if self.udp_rx_transport:
+                self.udp_rx_transport.close()
+
+        # Stop camera thread and release camera
+        if self.camera_thread:
+            self.camera_running = False
+            self.camera_thread.join(timeout=2.0)
+        if self.camera and not self.camera_thread.is_alive():  # Still inside grab() - daemon thread dies with us
             try:
                 self.camera.release()
                 print("✅ Camera released")
@@ -1794,6 +2477,12 @@ Examples:
         help="Disable conversation logging"
     )
 
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print per-packet and per-second audio stream stats"
+    )
+
     args = parser.parse_args()
 
     # Display configuration
@@ -1820,7 +2509,8 @@ Examples:
         esp32_ip_override=args.esp32_ip,
         mqtt_server_override=args.mqtt_server,
         mqtt_port_override=args.mqtt_port,
-        log_conversation=args.log_conversation
+        log_conversation=args.log_conversation,
+        verbose=args.verbose
     )
 
     try:
@@ -1830,7 +2520,10 @@ Examples:
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if UVLOOP_AVAILABLE:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\n👋 Goodbye!")
         import sys
@@ -9,6 +9,7 @@ import math
 import numpy as np
 import trimesh
 import pyglet
+pyglet.options['debug_gl'] = False  # no glGetError() after every GL call; must precede pyglet.gl
 from pyglet import gl
 from pyglet.math import Mat4, Vec3
 from pyglet.graphics.shader import Shader, ShaderProgram
@@ -31,7 +32,9 @@ out vec3 Normal;
 void main() {
     vec4 worldPos = model * vec4(position, 1.0);
     FragPos = worldPos.xyz;
-    Normal = mat3(transpose(inverse(model))) * normal;
+    // model is rotation + uniform scale, so mat3(model) is the normal matrix
+    // up to a scale factor that the fragment shader normalizes away
+    Normal = mat3(model) * normal;
     gl_Position = projection * view * worldPos;
 }
 """
@@ -93,12 +96,22 @@ class SkullViewer:
 
         # Animation
         self.max_jaw_angle = 60.0  # degrees
+        self.drawn_jaw_amount = None  # jaw value on screen; None forces a redraw
 
         # Camera
         self.camera_pos = Vec3(0, -4, 0)
         self.camera_target = Vec3(0, 0, 0)
         self.camera_up = Vec3(0, 0, 1)
 
+        # The camera never moves: build view and base model once, projection on resize
+        self.projection = None
+        self.view = Mat4.look_at(self.camera_pos, self.camera_target, self.camera_up)
+
+        # Base model transformation - scale and tilt
+        base_model = Mat4()
+        base_model = base_model.scale(Vec3(0.01, 0.01, 0.01))  # Scale down
+        self.base_model = base_model.rotate(-math.pi/2 + math.radians(20), Vec3(1, 0, 0))  # -90° + 20° tilt
+
     def on_mqtt_connect(self, client, userdata, flags, rc):
         print(f"🦴 Connected to MQTT broker (rc={rc})")
         client.subscribe("franky/jaw")
@@ -107,8 +120,8 @@ class SkullViewer:
     def on_mqtt_message(self, client, userdata, msg):
         try:
             if msg.topic == "franky/jaw":
-                value = float(msg.payload.decode())
-                self.jaw_open_amount = max(0.0, min(1.0, value))
+                value = float(msg.payload)  # float() parses ASCII bytes directly
+                self.jaw_open_amount = value if 0.0 <= value <= 1.0 else (0.0 if value < 0.0 else 1.0)
                 self.eyes_glowing = value > 0.05
             elif msg.topic == "franky/speaking":
                 self.eyes_glowing = msg.payload.decode() == "1"
@@ -171,30 +184,26 @@ class SkullViewer:
 
     def create_vao(self, mesh):
         """Create VAO and VBO for a mesh"""
-        # Get vertices and normals
-        vertices = mesh.vertices.astype(np.float32)
-        normals = mesh.vertex_normals.astype(np.float32)
+        # Interleave position + normal per vertex: one buffer, 24-byte stride
+        vertex_data = np.empty((len(mesh.vertices), 6), dtype=np.float32)
+        vertex_data[:, :3] = mesh.vertices
+        vertex_data[:, 3:] = mesh.vertex_normals
         indices = mesh.faces.flatten().astype(np.uint32)
+        stride = vertex_data.itemsize * 6
 
         # Create VAO
         vao = gl.GLuint()
         gl.glGenVertexArrays(1, vao)
         gl.glBindVertexArray(vao)
 
-        # Create VBO for vertices
-        vbo_vertices = gl.GLuint()
-        gl.glGenBuffers(1, vbo_vertices)
-        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, vbo_vertices)
-        gl.glBufferData(gl.GL_ARRAY_BUFFER, vertices.nbytes, vertices.ctypes.data, gl.GL_STATIC_DRAW)
-        gl.glVertexAttribPointer(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, 0)
+        # Create VBO for vertices and normals
+        vbo = gl.GLuint()
+        gl.glGenBuffers(1, vbo)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, vertex_data.nbytes, vertex_data.ctypes.data, gl.GL_STATIC_DRAW)
+        gl.glVertexAttribPointer(0, 3, gl.GL_FLOAT, gl.GL_FALSE, stride, 0)
         gl.glEnableVertexAttribArray(0)
-
-        # Create VBO for normals
-        vbo_normals = gl.GLuint()
-        gl.glGenBuffers(1, vbo_normals)
-        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, vbo_normals)
-        gl.glBufferData(gl.GL_ARRAY_BUFFER, normals.nbytes, normals.ctypes.data, gl.GL_STATIC_DRAW)
-        gl.glVertexAttribPointer(1, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, 0)
+        gl.glVertexAttribPointer(1, 3, gl.GL_FLOAT, gl.GL_FALSE, stride, 3 * vertex_data.itemsize)
         gl.glEnableVertexAttribArray(1)
 
         # Create EBO for indices
@@ -223,14 +232,38 @@ class SkullViewer:
         @self.window.event
         def on_resize(width, height):
             gl.glViewport(0, 0, width, height)
+            self.update_projection(width, height)
+            self.drawn_jaw_amount = None
             return pyglet.event.EVENT_HANDLED
 
+        @self.window.event
+        def on_expose():
+            self.drawn_jaw_amount = None
+
         # OpenGL setup
         gl.glEnable(gl.GL_DEPTH_TEST)
+        # Cranium and mandible are closed, outward-wound (CCW) solids
+        gl.glEnable(gl.GL_CULL_FACE)
+        gl.glCullFace(gl.GL_BACK)
+        gl.glFrontFace(gl.GL_CCW)
         gl.glClearColor(0.1, 0.05, 0.15, 1.0)
 
         # Compile shaders
         self.shader = self.create_shader_program(VERTEX_SHADER, FRAGMENT_SHADER)
+        if self.shader:
+            # Uniforms persist in the program, so the static ones are uploaded once
+            self.shader['view'] = self.view
+            self.shader['lightPos'] = (5.0, 5.0, 10.0)
+            self.shader['viewPos'] = (self.camera_pos.x, self.camera_pos.y, self.camera_pos.z)
+            self.shader['objectColor'] = (0.9, 0.9, 0.85)
+        self.update_projection(self.window.width, self.window.height)
+
+    def update_projection(self, width, height):
+        """Rebuild and upload the projection matrix for a new window size"""
+        aspect = width / max(height, 1)  # minimized windows report height 0
+        self.projection = Mat4.perspective_projection(aspect, 45.0, 0.1, 100.0)
+        if self.shader:
+            self.shader['projection'] = self.projection
 
     def create_shader_program(self, vertex_src, fragment_src):
         """Compile and link shaders"""
@@ -246,6 +279,9 @@ class SkullViewer:
 
     def render(self):
         """Render the skull"""
+        jaw_open_amount = self.jaw_open_amount
+        self.drawn_jaw_amount = jaw_open_amount
+
         gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
 
         if not self.shader:
@@ -253,22 +289,8 @@ class SkullViewer:
 
         self.shader.use()
 
-        # Setup matrices
-        aspect = self.window.width / self.window.height
-        projection = Mat4.perspective_projection(aspect, 45.0, 0.1, 100.0)
-        view = Mat4.look_at(self.camera_pos, self.camera_target, self.camera_up)
-
-        # Base model transformation - scale and tilt
-        base_model = Mat4()
-        base_model = base_model.scale(Vec3(0.01, 0.01, 0.01))  # Scale down
-        base_model = base_model.rotate(-math.pi/2 + math.radians(20), Vec3(1, 0, 0))  # -90° + 20° tilt
-
-        # Set uniforms
-        self.shader['projection'] = projection
-        self.shader['view'] = view
-        self.shader['lightPos'] = (5.0, 5.0, 10.0)
-        self.shader['viewPos'] = (self.camera_pos.x, self.camera_pos.y, self.camera_pos.z)
-        self.shader['objectColor'] = (0.9, 0.9, 0.85)
+        # Only the model matrix changes per frame; the rest was set in setup_window/on_resize
+        base_model = self.base_model
 
         # Draw upper jaw
         if self.upper_jaw_vao:
@@ -278,7 +300,7 @@ class SkullViewer:
 
         # Draw lower jaw with rotation
         if self.lower_jaw_vao:
-            jaw_angle = math.radians(self.jaw_open_amount * self.max_jaw_angle)
+            jaw_angle = math.radians(jaw_open_amount * self.max_jaw_angle)
             jaw_model = base_model @ Mat4.from_rotation(jaw_angle, Vec3(1, 0, 0))
 
             self.shader['model'] = jaw_model
@@ -289,8 +311,10 @@ class SkullViewer:
         self.shader.stop()
 
     def update(self, dt):
-        """Update animation state"""
-        pass  # Auto-rotation disabled
+        """Redraw only when the jaw moved or the window needs repainting"""
+        # Auto-rotation disabled, so an idle skull costs no GPU work
+        if self.jaw_open_amount != self.drawn_jaw_amount:
+            self.window.draw(dt)
 
     def run(self):
         """Main application loop"""
@@ -315,9 +339,9 @@ class SkullViewer:
         # Schedule update
         pyglet.clock.schedule_interval(self.update, 1/60.0)
 
-        # Run
+        # Run - update() drives redraws on demand instead of every tick
         print("🦴 Starting skull viewer...")
-        pyglet.app.run()
+        pyglet.app.run(None)
 
         # Cleanup
         self.mqtt_client.loop_stop()